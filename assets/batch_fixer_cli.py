@@ -3,104 +3,975 @@
 
 import os
 import json
+import argparse
+import atexit
+import calendar
+import cProfile
+import math
+import pstats
 import subprocess
 import sys
+import sqlite3
 import platform
 import shutil
-from datetime import datetime, timezone
+import struct
+import tempfile
+import time
+import threading
+import tracemalloc
+import queue
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from filename_classifier import (MEDIA_EXTENSIONS, MEDIA_EXTENSIONS_PREFERRED, SIDECAR_PATTERNS,
+                                 JPEG_EXTENSIONS, QUICKTIME_EXTENSIONS, is_media_lower, is_quicktime,
+                                 is_sidecar, sidecar_base)
+from native_writers import patch_jpeg_exif, patch_quicktime_dates
+from timezone_index import TimezoneIndex, TIMEZONE_DATA_FILENAME
+
+try:
+    import numpy
+except ImportError:  # optional: bulk timestamp formatting falls back to pure Python
+    numpy = None
 
 # --- New Logging Function ---
-# This prints JSON to stdout, which python-shell captures
-def log(message, tag=None):
-    """Prints a JSON object to stdout for Electron to capture."""
-    log_entry = {"text": message, "tag": tag}
-    print(json.dumps(log_entry))
-    sys.stdout.flush() # Ensure it's sent immediately
+# This prints JSON to stdout, which python-shell captures. Lines are buffered
+# and written together every LOG_FLUSH_INTERVAL seconds (or once
+# LOG_FLUSH_BYTES pile up) instead of one write, flush and Electron IPC
+# message per file. Below verbose, per-file success lines are only counted
+# and reported as periodic summary lines.
+
+LOG_QUIET = 0    # errors, warnings, summaries and the final report
+LOG_NORMAL = 1   # plus progress and info messages
+LOG_VERBOSE = 2  # plus one line per file
+LOG_LEVELS = {'quiet': LOG_QUIET, 'normal': LOG_NORMAL, 'verbose': LOG_VERBOSE}
+
+LOG_FLUSH_INTERVAL = 0.1
+LOG_FLUSH_BYTES = 64 * 1024
+LOG_SUMMARY_INTERVAL = 1.0
+
+
+class LogWriter:
+    """Thread-safe buffered writer of JSON log lines."""
+
+    def __init__(self, verbosity=LOG_NORMAL):
+        self.verbosity = verbosity
+        self._lock = threading.Lock()  # pipeline stages log from their own threads
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._file_counts = {}  # summary label -> [count since last summary, total, tag]
+        self._last_summary = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self, message, tag=None, level=LOG_NORMAL, fields=None):
+        if level > self.verbosity and tag not in ('error', 'warning'):
+            return
+        with self._lock:
+            self._append(message, tag, fields)
+            self._start_timer()
+            if self._buffered_bytes >= LOG_FLUSH_BYTES:
+                self._flush_locked()
+
+    def file_event(self, message, tag, summary):
+        """One per-file line: written as-is when verbose, else counted under summary."""
+        if self.verbosity >= LOG_VERBOSE:
+            self.write(message, tag, LOG_VERBOSE)
+            return
+        with self._lock:
+            counts = self._file_counts.setdefault(summary, [0, 0, tag])
+            counts[0] += 1
+            counts[1] += 1
+            self._start_timer()
+
+    def flush(self, summaries=False):
+        """Writes out buffered lines; with summaries=True also any pending file counts."""
+        with self._lock:
+            if summaries or time.monotonic() - self._last_summary >= LOG_SUMMARY_INTERVAL:
+                self._append_summaries()
+            self._flush_locked()
+
+    def close(self):
+        self._stop.set()
+        self.flush(summaries=True)
+
+    def _start_timer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _append(self, message, tag, fields=None):
+        entry = {"text": message, "tag": tag}
+        if fields:
+            entry.update(fields)
+        line = json.dumps(entry) + "\n"
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+
+    def _append_summaries(self):
+        for summary, counts in self._file_counts.items():
+            if counts[0]:
+                self._append(f"{summary}: +{counts[0]} ({counts[1]} total)", counts[2])
+                counts[0] = 0
+        self._last_summary = time.monotonic()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered_bytes = 0
+        try:
+            sys.stdout.write(data)
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            # Electron went away (or stdout is closed); nothing left to report to
+            pass
+
+    def _run(self):
+        while not self._stop.wait(LOG_FLUSH_INTERVAL):
+            self.flush()
+
+
+_log_writer = LogWriter()
+atexit.register(_log_writer.close)
+
+
+def log(message, tag=None, level=LOG_NORMAL, **fields):
+    """Queues a JSON object for stdout, where Electron captures it; extra
+    keyword arguments become extra keys of that object."""
+    _log_writer.write(message, tag, level, fields)
+
+
+def log_file(message, tag, summary):
+    """Logs a per-file success line, collapsed into `summary` counts below verbose."""
+    _log_writer.file_event(message, tag, summary)
+
+
+def flush_log_summaries():
+    """Reports pending per-file counts now, e.g. at the end of a phase."""
+    _log_writer.flush(summaries=True)
+
+# --- Stage Timers ---
+# Every stage and hot call (directory listing, sidecar reads and parsing,
+# media matching, ExifTool round-trips, moves...) records its duration under
+# a name. Durations go into log-scale histograms, so memory stays fixed no
+# matter how many files pass through, and the final summary reports count,
+# total, p50, p95 and max per name. Percentiles are accurate to one bucket.
+
+TIMER_MIN_SECONDS = 1e-6
+TIMER_BUCKETS_PER_OCTAVE = 8  # bucket bounds grow by 2**(1/8), about 9%
+
+
+class TimerHistogram:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}  # bucket number -> count; bucket b ends at TIMER_MIN_SECONDS * 2**(b / per octave)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds <= TIMER_MIN_SECONDS:
+            bucket = 0
+        else:
+            bucket = int(math.log2(seconds / TIMER_MIN_SECONDS) * TIMER_BUCKETS_PER_OCTAVE) + 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding that fraction of the samples, capped at max."""
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.max, TIMER_MIN_SECONDS * 2 ** (bucket / TIMER_BUCKETS_PER_OCTAVE))
+        return self.max
+
+
+class _TimerScope:
+    __slots__ = ('timers', 'name', 'started')
+
+    def __init__(self, timers, name):
+        self.timers = timers
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timers.record(self.name, time.perf_counter() - self.started)
+
+
+class StageTimers:
+    """Thread-safe named TimerHistograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # stages record from their own threads
+        self._histograms = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = TimerHistogram()
+            histogram.add(seconds)
+
+    def time(self, name):
+        """Context manager that records the duration of its block under name."""
+        return _TimerScope(self, name)
+
+    def summary(self):
+        """{name: {count, total, p50, p95, max}} in seconds, largest total first."""
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: item[1].total, reverse=True)
+            return {name: {
+                'count': histogram.count,
+                'total': round(histogram.total, 6),
+                'p50': round(histogram.percentile(0.50), 6),
+                'p95': round(histogram.percentile(0.95), 6),
+                'max': round(histogram.max, 6),
+            } for name, histogram in items}
+
+
+_stage_timers = StageTimers()
+
+
+def stage_timer(name):
+    return _stage_timers.time(name)
+
+
+def stage_timings():
+    return _stage_timers.summary()
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f}µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+def log_stage_timings():
+    summary = stage_timings()
+    if not summary:
+        return
+    log("⏱ Stage timings (count, total, p50, p95, max):", "info", timings=summary)
+    for name, timing in summary.items():
+        log(f"  {name:<24} {timing['count']:>8}  {format_seconds(timing['total']):>9}"
+            f"  {format_seconds(timing['p50']):>8}  {format_seconds(timing['p95']):>8}"
+            f"  {format_seconds(timing['max']):>8}", "info")
+
+
+class RunProfiler:
+    """--profile: cProfile for the main and every pipeline thread, merged into
+    one pstats file, plus tracemalloc's peak and its largest allocation sites.
+
+    Before Python 3.12, cProfile only follows the thread that enabled it,
+    so each new thread gets its own profiler through threading.setprofile.
+    From 3.12 on, one profiler sees every thread and a second one cannot be
+    enabled. checkpoint() keeps the tracemalloc snapshot taken while the
+    most memory was in use.
+    """
+
+    FILENAME = '.metadata_toolkit_profile.pstats'
+    TOP_ALLOCATIONS = 5
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot_path = os.path.splitext(path)[0] + '.tracemalloc'
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_size = -1
+
+    def start(self):
+        tracemalloc.start()
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._start_thread)
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        profile.enable()
+        return self
+
+    def _start_thread(self, frame, event, arg):
+        # First profile event of a new thread: swap this hook for a real profiler
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except Exception as e:
+            # Raising here would kill the thread before its target runs
+            _thread_state.profiler_error = e
+            return
+        with self._lock:
+            self._profiles.append(profile)
+
+    def checkpoint(self):
+        size = tracemalloc.get_traced_memory()[0]
+        if size > self._snapshot_size:
+            self._snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ])
+            self._snapshot_size = size
+
+    def stop(self):
+        threading.setprofile(None)
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            profile.disable()
+        self.checkpoint()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        for profile in profiles:
+            profile.create_stats()
+        # A thread that never ran Python code leaves an empty profile, which pstats rejects
+        profiles = [profile for profile in profiles if profile.stats]
+        try:
+            pstats.Stats(*profiles).dump_stats(self.path)
+            log(f"Profile written to {self.path} (view with: python -m pstats)", "info", LOG_QUIET)
+        except (OSError, TypeError) as e:
+            log(f"⚠️ Could not write the profile: {e}", "warning")
+        log(f"Peak traced memory: {peak / 2**20:.1f} MB", "info", LOG_QUIET, peak_memory_bytes=peak)
+        if self._snapshot is not None:
+            try:
+                self._snapshot.dump(self.snapshot_path)
+                log(f"Memory snapshot ({self._snapshot_size / 2**20:.1f} MB in use) written to "
+                    f"{self.snapshot_path}", "info", LOG_QUIET)
+            except OSError as e:
+                log(f"⚠️ Could not write the memory snapshot: {e}", "warning")
+            for stat in self._snapshot.statistics('lineno')[:self.TOP_ALLOCATIONS]:
+                log(f"  {stat.size / 2**20:8.1f} MB  {stat.count:>9} blocks  {stat.traceback[0]}", "info", LOG_QUIET)
+
 
 # --- All Helper Functions (from the original class) ---
 
-def find_json_files(root_dir):
-    patterns = [
-        '.supplemental-metadata.json', '.supplemental-metada.json',
-        '.supplemental-met.json', '.supplemental-m.json',
-        '.supplemental.json', '.supplement.json'
-    ]
-    json_files = []
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        # Skip special folders
-        if 'NO_METADATA_FOUND' in dirpath or 'JSON_METADATA' in dirpath:
-            continue
-        
-        for filename in filenames:
-            if any(filename.endswith(pattern) for pattern in patterns):
-                json_path = os.path.join(dirpath, filename)
-                json_files.append(json_path)
-    return json_files
-
-def find_media_file(json_path):
-    json_dir = os.path.dirname(json_path)
-    json_filename = os.path.basename(json_path)
-    base_name = json_filename
-    json_patterns = [
-        '.supplemental-metadata.json', '.supplemental-metada.json',
-        '.supplemental-met.json', '.supplemental-m.json',
-        '.supplemental.json', '.supplement.json'
-    ]
-    for pattern in json_patterns:
-        if base_name.endswith(pattern):
-            base_name = base_name[:-len(pattern)]
-            break
-    
-    media_extensions = [
-        '.jpg', '.jpeg', '.heic', '.png', '.gif', '.webp', '.mp4', '.m4v', 
-        '.mov', '.MP.jpg', '.HEIC', '.JPG', '.PNG', '.MP4', '.MOV'
-    ]
-    
-    for ext in media_extensions:
-        potential_file = os.path.join(json_dir, base_name + ext)
-        if os.path.exists(potential_file):
-            return potential_file
-
-    # Case-insensitive check in the same directory
-    if os.path.exists(json_dir):
-        files_in_dir = os.listdir(json_dir)
-        for filename in files_in_dir:
-            # Skip JSON files when checking for media files
-            if any(filename.endswith(pattern) for pattern in json_patterns):
-                continue
-            
-            if filename.lower().startswith(base_name.lower()):
-                for ext in media_extensions:
-                    if filename.lower().endswith(ext.lower()):
-                        return os.path.join(json_dir, filename)
+def find_json_files(root_dir, manifest=None):
+    if manifest is None:
+        manifest = TreeManifest.build(root_dir)
+    return list(manifest.sidecar_paths())
+
+# --- Directory Index ---
+# One os.scandir pass per directory replaces the per-sidecar exists()/listdir()
+# probing; media matching then works on in-memory lookups. Which names are
+# sidecars or media is decided by filename_classifier.py.
+
+SKIPPED_FOLDERS = ('NO_METADATA_FOUND', 'JSON_METADATA')
+
+
+class DirectoryIndex:
+    """In-memory listing of a single directory, built from one os.scandir pass."""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = set()
+        self.subdirs = []
+        self.sidecar_files = []  # sidecar filenames, in scan order
+        self.media_names = []  # media filenames, in scan order (names differing only in case included)
+        self.media_by_name = {}  # lowercased media filename -> media filename
+        self.folded_files = None  # lowercased files, once fold_case() is called
+        self._sorted_media_names = None
+
+    @classmethod
+    def scan(cls, path):
+        index = cls(path)
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        index.subdirs.append(entry.name)
+                    else:
+                        index.add_file(entry.name)
+        except OSError:
+            # Missing or unreadable directory: behaves like an empty one
+            pass
+        return index
+
+    @classmethod
+    def from_entries(cls, path, subdirs, sidecars, media, other):
+        """Rebuilds an index from a cached listing that was already classified."""
+        index = cls(path)
+        index.subdirs = list(subdirs)
+        for filename in sidecars:
+            index.add_file(filename)
+        for filename in media:
+            index.add_file(filename)
+        # Reclassified: older caches filed media names differing only in case under other
+        for filename in other:
+            index.add_file(filename)
+        return index
+
+    def classified_entries(self):
+        """(sidecars, media, other) filenames, the form ScanCache persists."""
+        media = self.media_names
+        classified = set(self.sidecar_files)
+        classified.update(media)
+        return self.sidecar_files, media, [name for name in self.files if name not in classified]
+
+    def add_file(self, filename):
+        self.files.add(filename)
+        if is_sidecar(filename):
+            self.sidecar_files.append(filename)
+            return
+
+        lower = filename.lower()
+        if is_media_lower(lower):
+            if lower == filename:
+                lower = filename  # share the string instead of keeping an equal copy
+            self.media_names.append(filename)
+            self.media_by_name[lower] = filename
+            self._sorted_media_names = None
+
+    def fold_case(self):
+        """Makes unique_destination treat names differing only in case as taken."""
+        self.folded_files = {name.lower() for name in self.files}
+
+    def match_media(self, base_name, allow_prefix=True):
+        """Returns the media filename belonging to a sidecar base name, or None."""
+        # Exact names first, in the original extension preference order
+        for ext in MEDIA_EXTENSIONS:
+            if base_name + ext in self.files:
+                return base_name + ext
+
+        lower = base_name.lower()
+        if allow_prefix and lower in self.media_by_name:
+            return self.media_by_name[lower]
+
+        # Case-insensitive stem: 'x' finds 'X.JPG', and 'x' or 'x.mp' finds 'x.MP.jpg'
+        for ext in MEDIA_EXTENSIONS_PREFERRED:
+            media_name = self.media_by_name.get(lower + ext)
+            if media_name:
+                return media_name
+
+        if not allow_prefix:
+            return None
+
+        # Truncated sidecar names: the media filename merely starts with the base
+        if self._sorted_media_names is None:
+            self._sorted_media_names = sorted(self.media_by_name)
+        names = self._sorted_media_names
+        i = bisect_left(names, lower)
+        if i < len(names) and names[i].startswith(lower):
+            return self.media_by_name[names[i]]
+        return None
+
+
+def get_directory_index(directory_index, path, scan=None):
+    """Looks up (or lazily scans and caches) the DirectoryIndex for path."""
+    index = directory_index.get(path)
+    if index is None:
+        index = (scan or DirectoryIndex.scan)(path)
+        directory_index[path] = index
+    return index
+
+
+def is_case_insensitive(path):
+    """True when the existing folder at path can also be reached with its name's case swapped."""
+    parent, name = os.path.split(path)
+    swapped = name.swapcase()
+    if swapped == name:
+        return False
+    try:
+        return os.path.samefile(path, os.path.join(parent, swapped))
+    except OSError:
+        return False
+
+
+def destination_index(manifest, folder):
+    """Creates a move destination folder and returns its DirectoryIndex, with
+    names reserved case-insensitively where the filesystem ignores case
+    (the macOS and Windows defaults), so a move never replaces a file whose
+    name differs only in case."""
+    os.makedirs(folder, exist_ok=True)
+    dest_index = get_directory_index(manifest.index, folder)
+    if dest_index.folded_files is None and is_case_insensitive(folder):
+        dest_index.fold_case()
+    return dest_index
+
+
+def unique_destination(dest_index, filename):
+    """Picks a non-clashing name in dest_index's folder and reserves it."""
+    taken = dest_index.files
+    folded = dest_index.folded_files
+    dest_name = filename
+    counter = 1
+    name, ext = os.path.splitext(filename)
+    while (dest_name in taken) if folded is None else (dest_name.lower() in folded):
+        dest_name = f"{name}_{counter}{ext}"
+        counter += 1
+    taken.add(dest_name)
+    if folded is not None:
+        folded.add(dest_name.lower())
+    return os.path.join(dest_index.path, dest_name)
+
+
+class TreeManifest:
+    """Every directory, sidecar and media file under a root, from one traversal.
+
+    The write, separation and organization phases all work from this instead
+    of walking the tree again. `index` maps directory paths to DirectoryIndex
+    and doubles as the lookup cache for find_media_file, which may also scan
+    directories outside the tree (a sidecar's parent); `directories` lists
+    only the in-tree ones.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.directories = []
+        self.index = {}
+
+    @classmethod
+    def build(cls, root_dir, scan_cache=None):
+        manifest = cls(root_dir)
+        for _ in manifest.walk(scan_cache):
+            pass
+        return manifest
+
+    def walk(self, scan_cache=None):
+        """Indexes the tree top-down, yielding each directory path once it is indexed."""
+        scan = scan_cache.scan if scan_cache is not None else None
+        pending = [self.root_dir]
+        while pending:
+            dirpath = pending.pop()
+            with stage_timer('walk.list_directory'):
+                dir_index = get_directory_index(self.index, dirpath, scan)
+            self.directories.append(dirpath)
+            # Reversed so the stack pops subfolders in scan order (top-down like os.walk)
+            for name in reversed(dir_index.subdirs):
+                if name not in SKIPPED_FOLDERS:
+                    pending.append(os.path.join(dirpath, name))
+            yield dirpath
+
+    def walk_sidecars(self, scan_cache=None):
+        """Like sidecars, but walks the tree as it goes so callers can start early."""
+        for dirpath in self.walk(scan_cache):
+            for filename in self.index[dirpath].sidecar_files:
+                yield dirpath, filename
+
+    def sidecars(self):
+        """Yields (directory path, sidecar filename) for every sidecar in the tree."""
+        for dirpath in self.directories:
+            for filename in self.index[dirpath].sidecar_files:
+                yield dirpath, filename
+
+    def sidecar_count(self):
+        return sum(len(self.index[dirpath].sidecar_files) for dirpath in self.directories)
+
+    def sidecar_paths(self):
+        for dirpath, filename in self.sidecars():
+            yield os.path.join(dirpath, filename)
+
+    def media_files(self):
+        """Yields (DirectoryIndex, media filename) for every media file in the tree."""
+        for dirpath in self.directories:
+            dir_index = self.index[dirpath]
+            for filename in dir_index.media_names:
+                yield dir_index, filename
+
+
+class ScanCache:
+    """Directory listings from earlier runs, keyed by each directory's mtime.
+
+    A directory's mtime changes whenever an entry is added, removed or renamed,
+    which is all the classification depends on, so an unchanged mtime means
+    the cached listing can be reused without touching the disk. Listings
+    younger than RACY_WINDOW_NS are not stored, since a change in the same
+    timestamp tick would go unnoticed.
+    """
+
+    FILENAME = '.metadata_toolkit_scan_cache.sqlite'
+    RACY_WINDOW_NS = 2 * 10**9
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        # The walk runs on a pipeline thread; the connection is only ever used by one thread at a time
+        self.conn = sqlite3.connect(os.path.join(root_dir, self.FILENAME), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS directories ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " listing TEXT NOT NULL)"
+        )
+        self.rows = dict(self.conn.execute("SELECT path, mtime_ns FROM directories"))
+        self.seen = set()
+        self.updates = []
+        self.hits = 0
+        self.misses = 0
+        self.started_ns = time.time_ns()
+
+    def scan(self, path):
+        key = os.path.relpath(path, self.root_dir)
+        self.seen.add(key)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return DirectoryIndex.scan(path)
+
+        if self.rows.get(key) == mtime_ns:
+            row = self.conn.execute(
+                "SELECT listing FROM directories WHERE path = ?", (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                subdirs, sidecars, media, other = json.loads(row[0])
+                return DirectoryIndex.from_entries(path, subdirs, sidecars, media, other)
+
+        # stat before listing: a change during the scan leaves a stale mtime, forcing a rescan next time
+        self.misses += 1
+        index = DirectoryIndex.scan(path)
+        if mtime_ns < self.started_ns - self.RACY_WINDOW_NS:
+            listing = json.dumps([index.subdirs, *index.classified_entries()])
+            self.updates.append((key, mtime_ns, listing))
+        return index
+
+    def save(self):
+        """Stores the new listings and forgets directories that no longer exist."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO directories (path, mtime_ns, listing) VALUES (?, ?, ?)",
+            self.updates)
+        self.conn.executemany(
+            "DELETE FROM directories WHERE path = ?",
+            [(key,) for key in self.rows if key not in self.seen])
+        self.conn.commit()
+        self.updates = []
+
+    def close(self):
+        self.conn.close()
+
+
+def finish_scan_cache(cache):
+    """Saves and closes a ScanCache after the walk (no-op for None)."""
+    if cache is None:
+        return
+    cache.save()
+    cache.close()
+    log(f"Scan cache: {cache.hits} directories reused, {cache.misses} re-listed", "info")
+
+
+def find_media_file(json_path, directory_index=None):
+    if directory_index is None:
+        directory_index = {}
+    found = find_media(os.path.dirname(json_path), os.path.basename(json_path), directory_index)
+    if found is None:
+        return None
+    return os.path.join(*found)
+
+
+def find_media(json_dir, json_filename, directory_index):
+    """Like find_media_file, but returns (media directory, media filename) or None.
+
+    The directory is the index's own path string, so callers can keep it
+    without holding a copy per file.
+    """
+    base_name = sidecar_base(json_filename)
+
+    # Same directory: exact, case-insensitive and truncated-name matches
+    dir_index = get_directory_index(directory_index, json_dir)
+    media_name = dir_index.match_media(base_name)
+    if media_name:
+        return dir_index.path, media_name
 
     parent_dir = os.path.dirname(json_dir)
     if parent_dir and parent_dir != json_dir:
-        for ext in media_extensions:
-            potential_file = os.path.join(parent_dir, base_name + ext)
-            if os.path.exists(potential_file):
-                return potential_file
+        dir_index = get_directory_index(directory_index, parent_dir)
+        media_name = dir_index.match_media(base_name, allow_prefix=False)
+        if media_name:
+            return dir_index.path, media_name
     return None
 
-def is_pdt(timestamp):
-    dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-    year = dt.year
-    month = dt.month
-    day = dt.day
-    # Simplified logic, good enough for recent/future years
-    if month < 3 or month > 11: return False
-    if month > 3 and month < 11: return True
-    # Handle March (starts 2nd Sunday)
-    if month == 3:
-        first_day_of_month = datetime(year, 3, 1).weekday() # 0=Mon, 6=Sun
-        second_sunday = 14 - (first_day_of_month + 1) % 7
-        return day >= second_sunday
-    # Handle November (ends 1st Sunday)
-    if month == 11:
-        first_day_of_month = datetime(year, 11, 1).weekday()
-        first_sunday = 7 - (first_day_of_month + 1) % 7
-        return day <= first_sunday
-    return False
+# --- Timezone Offset Tables ---
+# A zone's UTC offset is a step function of time: sorted UTC transition
+# instants plus the offset in effect after each one. Lookups are one bisect.
+
+class OffsetTable:
+    """UTC offsets of one zone as a sorted list of transition instants."""
+
+    def __init__(self, transitions, offsets, valid_from=None, valid_until=None, fallback=None):
+        # offsets[i] is in effect from transitions[i - 1] up to transitions[i];
+        # offsets[0] applies before the first transition. With a fallback,
+        # the table only holds for valid_from <= timestamp < valid_until and
+        # fallback(timestamp) answers outside that range.
+        self.transitions = transitions
+        self.offsets = offsets
+        self.valid_from = valid_from
+        self.valid_until = valid_until
+        self.fallback = fallback
+
+    def covers(self, timestamp):
+        return self.fallback is None or self.valid_from <= timestamp < self.valid_until
+
+    def offset_at(self, timestamp):
+        if not self.covers(timestamp):
+            return self.fallback(timestamp)
+        return self.offsets[bisect_right(self.transitions, timestamp)]
+
+
+PST_OFFSET = -8 * 3600
+PDT_OFFSET = -7 * 3600
+
+
+def _nth_sunday(year, month, n):
+    """Day of the month of the n-th Sunday (n=-1: last Sunday)."""
+    if n > 0:
+        first_weekday = calendar.weekday(year, month, 1)  # 0=Mon, 6=Sun
+        return 1 + (6 - first_weekday) % 7 + 7 * (n - 1)
+    last_day = calendar.monthrange(year, month)[1]
+    return last_day - (calendar.weekday(year, month, last_day) + 1) % 7
+
+
+def _us_pacific_dst_dates(year):
+    """(month, day) DST starts and ends in US Pacific time, per the rules in force that year."""
+    if year == 1974:  # year-round DST during the energy crisis
+        return (1, 6), (10, 27)
+    if year == 1975:
+        return (2, 23), (10, 26)
+    if year < 1987:
+        return (4, _nth_sunday(year, 4, -1)), (10, _nth_sunday(year, 10, -1))
+    if year < 2007:
+        return (4, _nth_sunday(year, 4, 1)), (10, _nth_sunday(year, 10, -1))
+    return (3, _nth_sunday(year, 3, 2)), (11, _nth_sunday(year, 11, 1))
+
+
+def build_us_pacific_table(first_year=1970, last_year=2100):
+    """Exact UTC instants of the 2 AM local switches between PST and PDT."""
+    transitions = []
+    offsets = [PST_OFFSET]
+    for year in range(first_year, last_year + 1):
+        (start_month, start_day), (end_month, end_day) = _us_pacific_dst_dates(year)
+        # 2:00 PST -> 3:00 PDT, and 2:00 PDT -> 1:00 PST
+        transitions.append(calendar.timegm((year, start_month, start_day, 2, 0, 0)) - PST_OFFSET)
+        offsets.append(PDT_OFFSET)
+        transitions.append(calendar.timegm((year, end_month, end_day, 2, 0, 0)) - PDT_OFFSET)
+        offsets.append(PST_OFFSET)
+    return OffsetTable(transitions, offsets)
+
+
+PACIFIC_OFFSETS = build_us_pacific_table()
+
+# Sampling steps for the part of a zone's history found through zoneinfo:
+# the rule-based years after the last transition its TZif file lists switch
+# at most twice a year, months apart; without TZif data every change since
+# 1970 is sampled, and transitions closer together than the step are missed
+ZONE_RULE_STEP = 7 * 86400
+ZONE_TABLE_STEP = 6 * 3600
+
+_zone_tables = {}
+_zone_tables_lock = threading.Lock()
+
+
+def import_zoneinfo():
+    """The zoneinfo module, imported on first use: only --tz needs it, and it is new in Python 3.9."""
+    try:
+        import zoneinfo
+    except ImportError:
+        raise RuntimeError("--tz needs Python 3.9 or later") from None
+    return zoneinfo
+
+
+def is_known_zone(tz_name):
+    zoneinfo = import_zoneinfo()
+    try:
+        zoneinfo.ZoneInfo(tz_name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def read_tzif(tz_name):
+    """parse_tzif of the zone's TZif file, looked up the way zoneinfo does
+    (TZPATH, then the tzdata package); None if not found."""
+    zoneinfo = import_zoneinfo()
+    data = None
+    for directory in zoneinfo.TZPATH:
+        path = os.path.join(directory, *tz_name.split('/'))
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            break
+    if data is None:
+        try:
+            from importlib import resources
+            data = resources.files('tzdata').joinpath('zoneinfo', *tz_name.split('/')).read_bytes()
+        except (ImportError, OSError):
+            return None
+    try:
+        return parse_tzif(data)
+    except (ValueError, struct.error, IndexError):
+        return None
+
+
+def parse_tzif(data):
+    """(transitions, offsets, rule) from TZif data (RFC 8536).
+
+    Uses the 64-bit block of version 2+ files; rule is the POSIX TZ footer
+    that governs after the last transition ('' for version 1 files).
+    offsets[0] is local time type 0, which RFC 8536 applies before the first
+    transition.
+    """
+    if data[:4] != b'TZif':
+        raise ValueError("not a TZif file")
+
+    def counts(pos):
+        # isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt
+        return struct.unpack_from('>6l', data, pos + 20)
+
+    isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = counts(0)
+    pos = 44
+    time_format = 'l'
+    if data[4:5] >= b'2':
+        pos += timecnt * 5 + typecnt * 6 + charcnt + leapcnt * 8 + isstdcnt + isutcnt
+        isutcnt, isstdcnt, leapcnt, timecnt, typecnt, charcnt = counts(pos)
+        pos += 44
+        time_format = 'q'
+    times = struct.unpack_from(f'>{timecnt}{time_format}', data, pos)
+    pos += timecnt * struct.calcsize(time_format)
+    indices = data[pos:pos + timecnt]
+    pos += timecnt
+    type_offsets = [struct.unpack_from('>l', data, pos + 6 * i)[0] for i in range(typecnt)]
+
+    rule = ''
+    if time_format == 'q' and data.endswith(b'\n'):
+        rule = data[:-1].rsplit(b'\n', 1)[-1].decode('ascii')
+
+    transitions = []
+    offsets = [type_offsets[0]]
+    for timestamp, index in zip(times, indices):
+        if transitions and type_offsets[index] == offsets[-1]:
+            continue  # only the zone's name or DST flag changed
+        transitions.append(timestamp)
+        offsets.append(type_offsets[index])
+    return transitions, offsets, rule
+
+
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def build_zone_table(tz_name, last_year=2100):
+    """Transition table of an IANA zone.
+
+    Transitions come from the zone's TZif file, the data zoneinfo itself
+    reads; the rule-based years after its last listed transition are found
+    by sampling zoneinfo and bisecting each change down to the exact second.
+    Timestamps before the first transition or after last_year go to zoneinfo.
+    """
+    zone = import_zoneinfo().ZoneInfo(tz_name)
+
+    def offset_at(timestamp):
+        # Epoch arithmetic rather than fromtimestamp, which rejects negative values on Windows
+        local = (UNIX_EPOCH + timedelta(seconds=timestamp)).astimezone(zone)
+        return int(local.utcoffset().total_seconds())
+
+    tzif = read_tzif(tz_name)
+    step = ZONE_RULE_STEP
+    if tzif is None:
+        log(f"⚠️ No TZif data found for {tz_name}; sampling zoneinfo from 1970", "warning")
+        tzif = [], [0], ','
+        step = ZONE_TABLE_STEP
+    transitions, offsets, rule = tzif
+    start = transitions[-1] if transitions else calendar.timegm((1970, 1, 1, 0, 0, 0))
+    end = calendar.timegm((last_year + 1, 1, 1, 0, 0, 0))
+    valid_from = transitions[0] if transitions else start
+    offsets[-1] = offset_at(start)
+    # A rule without a ',' part has no DST: the last offset holds for good
+    timestamp = start if ',' in rule else end
+    while timestamp < end:
+        step_end = min(timestamp + step, end)
+        if offset_at(step_end) == offsets[-1]:
+            timestamp = step_end
+            continue
+        low, high = timestamp, step_end  # offset changes in (low, high]
+        while high - low > 1:
+            middle = (low + high) // 2
+            if offset_at(middle) == offsets[-1]:
+                low = middle
+            else:
+                high = middle
+        transitions.append(high)
+        offsets.append(offset_at(high))
+        timestamp = high
+    return OffsetTable(transitions, offsets, valid_from, end, offset_at)
+
+
+def get_zone_table(tz_name):
+    """Cached build_zone_table; each zone is built once per run."""
+    with _zone_tables_lock:
+        table = _zone_tables.get(tz_name)
+        if table is None:
+            table = build_zone_table(tz_name)
+            _zone_tables[tz_name] = table
+        return table
+
+
+def format_utc_offset(offset_seconds):
+    """Seconds east of UTC -> EXIF OffsetTime string like '+05:30'."""
+    sign = '+' if offset_seconds >= 0 else '-'
+    minutes = abs(offset_seconds) // 60
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+AUTO_GPS_TZ = 'auto-gps'
+
+# Zone used for photos without GPS in auto-gps mode when --tz-default is not given
+DEFAULT_ZONES = {'pacific': 'America/Los_Angeles', 'utc': 'UTC'}
+
+
+class GpsZoneResolver:
+    """Maps a photo's coordinates to an IANA zone name for --tz auto-gps.
+
+    Photos without usable GPS, outside every boundary, or in a zone the local
+    tz database does not know get default_zone.
+    """
+
+    def __init__(self, index, default_zone):
+        self.index = index
+        self.default_zone = default_zone
+        self._known_zones = {}
+
+    def __call__(self, latitude, longitude):
+        if latitude is None or longitude is None:
+            return self.default_zone
+        if latitude == 0.0 and longitude == 0.0:  # Takeout's "no location"
+            return self.default_zone
+        tz_name = self.index.lookup(latitude, longitude)
+        if tz_name is None:
+            return self.default_zone
+        known = self._known_zones.get(tz_name)
+        if known is None:
+            known = is_known_zone(tz_name)
+            if not known:
+                log(f"⚠️ Timezone {tz_name} from the boundary data is unknown here; using {self.default_zone}", "warning")
+            self._known_zones[tz_name] = known
+        return tz_name if known else self.default_zone
+
+
+def load_gps_zone_resolver(data_path, default_zone):
+    """GpsZoneResolver over the boundary dataset at data_path (or the one
+    bundled next to this script); None when the file is missing."""
+    if data_path is None:
+        data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), TIMEZONE_DATA_FILENAME)
+    if not os.path.isfile(data_path):
+        log(f"✗ --tz auto-gps needs timezone boundary data; none found at {data_path} (see --tz-data)", "error")
+        return None
+    log(f"Loading timezone boundaries from {data_path}...", "info")
+    index = TimezoneIndex.load(data_path)
+    log(f"✓ Loaded {len(index.zone_names)} timezones; photos without GPS use {default_zone}", "success")
+    return GpsZoneResolver(index, default_zone)
+
 
 def get_pacific_datetime(utc_timestamp):
     # Attempt conversion, log error if timestamp is invalid
@@ -110,13 +981,7 @@ def get_pacific_datetime(utc_timestamp):
         log(f"Invalid timestamp for Pacific conversion: {utc_timestamp}", "error")
         return None # Indicate failure
         
-    offset_seconds = -8 * 3600  # PST
-    if is_pdt(utc_ts):
-        offset_seconds = -7 * 3600  # PDT
-    
-    pacific_timestamp = utc_ts + offset_seconds
-    dt = datetime.fromtimestamp(pacific_timestamp, tz=timezone.utc)
-    return dt.strftime('%Y:%m:%d %H:%M:%S')
+    return format_local_datetimes([utc_ts], PACIFIC_OFFSETS)[0][0]
 
 def get_utc_datetime(utc_timestamp):
     # Attempt conversion, log error if timestamp is invalid
@@ -126,71 +991,129 @@ def get_utc_datetime(utc_timestamp):
         log(f"Invalid timestamp for UTC conversion: {utc_timestamp}", "error")
         return None # Indicate failure
         
-    dt = datetime.fromtimestamp(utc_ts, tz=timezone.utc)
-    return dt.strftime('%Y:%m:%d %H:%M:%S')
+    return format_local_datetimes([utc_ts], UTC_OFFSETS)[0][0]
+
+
+# --- Bulk Timestamp Formatting ---
+# The tag plan stage formats a whole batch of timestamps per zone at once:
+# offsets come from the zone's OffsetTable, and the EXIF strings from NumPy
+# datetime64 when it is installed, otherwise from integer date arithmetic
+# with a per-day string cache (photos cluster on few days).
+
+UTC_OFFSETS = OffsetTable([], [0])
+
+# UTC instants whose local time is within years 1-9999 (what datetime can
+# format) in every zone; a day of margin covers any UTC offset
+MIN_FORMATTABLE_TIMESTAMP = calendar.timegm((1, 1, 2, 0, 0, 0))
+MAX_FORMATTABLE_TIMESTAMP = calendar.timegm((9999, 12, 31, 0, 0, 0))
+
+_day_strings = {}
+
+
+def is_formattable_timestamp(utc_ts):
+    return MIN_FORMATTABLE_TIMESTAMP <= utc_ts <= MAX_FORMATTABLE_TIMESTAMP
+
+
+def _civil_from_days(days):
+    """Days since 1970-01-01 -> (year, month, day), proleptic Gregorian."""
+    z = days + 719468
+    era = z // 146097
+    day_of_era = z - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = shifted_month + 3 if shifted_month < 10 else shifted_month - 9
+    return year_of_era + era * 400 + (month <= 2), month, day
+
+
+def _format_local_python(local_timestamps):
+    formatted = []
+    for local_ts in local_timestamps:
+        days, seconds = divmod(local_ts, 86400)
+        day_str = _day_strings.get(days)
+        if day_str is None:
+            day_str = '%04d:%02d:%02d' % _civil_from_days(days)
+            _day_strings[days] = day_str
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        formatted.append('%s %02d:%02d:%02d' % (day_str, hours, minutes, seconds))
+    return formatted
+
+
+def _format_local_numpy(timestamps, table):
+    utc = numpy.asarray(timestamps, dtype=numpy.int64)
+    positions = numpy.searchsorted(numpy.asarray(table.transitions, dtype=numpy.int64), utc, side='right')
+    offsets = numpy.asarray(table.offsets, dtype=numpy.int64)[positions]
+    if table.fallback is not None:
+        for index in numpy.flatnonzero((utc < table.valid_from) | (utc >= table.valid_until)).tolist():
+            offsets[index] = table.fallback(int(utc[index]))
+    # 'YYYY-MM-DDTHH:MM:SS' -> 'YYYY:MM:DD HH:MM:SS'
+    iso = numpy.datetime_as_string((utc + offsets).astype('datetime64[s]'), unit='s')
+    formatted = [value.replace('-', ':').replace('T', ' ') for value in iso.tolist()]
+    return formatted, offsets.tolist()
+
+
+def format_local_datetimes(timestamps, table):
+    """Formats UTC epoch seconds as local EXIF date strings in one zone.
 
-def move_files_without_matching_json(source_folder):
+    Returns (datetime strings, offsets in seconds), both parallel to timestamps.
+    """
+    if numpy is not None and len(timestamps) > 1:
+        return _format_local_numpy(timestamps, table)
+    offsets = [table.offset_at(utc_ts) for utc_ts in timestamps]
+    return _format_local_python([utc_ts + offset for utc_ts, offset in zip(timestamps, offsets)]), offsets
+
+def move_files_without_matching_json(source_folder, manifest=None):
     try:
-        no_metadata_folder = os.path.join(source_folder, "NO_METADATA_FOUND")
-        os.makedirs(no_metadata_folder, exist_ok=True)
-        media_extensions = [
-            '.jpg', '.jpeg', '.heic', '.png', '.gif', '.webp', '.mp4', '.m4v',
-            '.mov', '.MP.jpg', '.HEIC', '.JPG', '.PNG', '.MP4', '.MOV'
-        ]
-        json_patterns = [
-            '.supplemental-metadata.json', '.supplemental-metada.json',
-            '.supplemental-met.json', '.supplemental-m.json',
-            '.supplemental.json', '.supplement.json'
-        ]
+        if manifest is None:
+            manifest = TreeManifest.build(source_folder)
+        dest_index = destination_index(manifest, os.path.join(source_folder, "NO_METADATA_FOUND"))
         moved_count = 0
         
-        for dirpath, dirnames, filenames in os.walk(source_folder):
-            # Prune search: Don't descend into already processed/created folders
-            dirnames[:] = [d for d in dirnames if d not in ('NO_METADATA_FOUND', 'JSON_METADATA')]
-            
-            for filename in filenames:
-                is_media = any(filename.lower().endswith(ext.lower()) for ext in media_extensions)
-                if not is_media:
-                    continue
-
-                has_matching_json = False
-                # Efficiently check for corresponding JSON
-                base, _ = os.path.splitext(filename)
-                for pattern in json_patterns:
-                    # Check if a JSON file exists that starts with the base name and ends with a pattern
-                    # This handles cases like IMG_1234.JPG.json matching IMG_1234.JPG
-                    potential_json = filename + pattern
-                    if os.path.exists(os.path.join(dirpath, potential_json)):
-                         has_matching_json = True
-                         break
-                    # Handle cases like edited photos IMG_1234(1).jpg having IMG_1234.jpg(1).json
-                    if '(' in base and base.endswith(')'):
-                         parts = base.rsplit('(', 1)
-                         alt_json_base = parts[0]
-                         alt_json_suffix = '(' + parts[1]
-                         potential_alt_json = alt_json_base + pattern + alt_json_suffix
-                         if os.path.exists(os.path.join(dirpath, potential_alt_json)):
-                              has_matching_json = True
-                              break
-
-                if not has_matching_json:
-                    source_file = os.path.join(dirpath, filename)
-                    dest_path = os.path.join(no_metadata_folder, filename)
-                    # Handle potential duplicate filenames in the destination
-                    counter = 1
-                    base_dest_path = dest_path
-                    while os.path.exists(dest_path):
-                         name, ext = os.path.splitext(base_dest_path)
-                         dest_path = f"{name}_{counter}{ext}"
-                         counter += 1
+        # Moves only add to dest_index, never to the indexes being iterated
+        folded_dir = None
+        for dir_index, filename in manifest.media_files():
+            if dir_index is not folded_dir:
+                # Sidecars are matched ignoring case, like find_media; one folder's names at a time
+                folded_dir = dir_index
+                folded_names = {name.lower() for name in dir_index.files}
+            has_matching_json = False
+            # Efficiently check for corresponding JSON
+            lower = filename.lower()
+            base, _ = os.path.splitext(lower)
+            # Handle cases like edited photos IMG_1234(1).jpg having IMG_1234.jpg(1).json
+            alt_json_base = alt_json_suffix = None
+            if '(' in base and base.endswith(')'):
+                alt_json_base, alt_json_suffix = base.rsplit('(', 1)
+                alt_json_suffix = '(' + alt_json_suffix
+            for pattern in SIDECAR_PATTERNS:
+                # Check if a JSON file exists that starts with the base name and ends with a pattern
+                # This handles cases like IMG_1234.JPG.json matching IMG_1234.JPG
+                potential_json = lower + pattern
+                if potential_json in folded_names:
+                     has_matching_json = True
+                     break
+                if alt_json_base is not None:
+                     potential_alt_json = alt_json_base + pattern + alt_json_suffix
+                     if potential_alt_json in folded_names:
+                          has_matching_json = True
+                          break
 
-                    try:
+            if not has_matching_json:
+                source_file = os.path.join(dir_index.path, filename)
+                # Handle potential duplicate filenames in the destination
+                dest_path = unique_destination(dest_index, filename)
+
+                try:
+                    with stage_timer('move.file'):
                         shutil.move(source_file, dest_path)
-                        log(f"  ✓ Moved (no JSON): {filename}", "warning")
-                        moved_count += 1
-                    except Exception as e:
-                        log(f"  ✗ Failed to move {filename} to NO_METADATA: {e}", "error")
+                    log_file(f"  ✓ Moved (no JSON): {filename}", "warning", "✓ Moved to NO_METADATA_FOUND")
+                    moved_count += 1
+                except Exception as e:
+                    log(f"  ✗ Failed to move {filename} to NO_METADATA: {e}", "error")
         
+        flush_log_summaries()
         if moved_count > 0:
             log(f"✓ Separated {moved_count} files into NO_METADATA_FOUND", "success")
             # Consider adding a README here if desired
@@ -199,38 +1122,34 @@ def move_files_without_matching_json(source_folder):
         log(f"✗ Error during file separation: {str(e)}", "error")
 
 
-def organize_json_files(source_folder):
+def organize_json_files(source_folder, manifest=None, journal=None):
     try:
-        json_folder = os.path.join(source_folder, "JSON_METADATA")
-        os.makedirs(json_folder, exist_ok=True)
-        json_patterns = [
-            '.supplemental-metadata.json', '.supplemental-metada.json',
-            '.supplemental-met.json', '.supplemental-m.json',
-            '.supplemental.json', '.supplement.json'
-        ]
+        if manifest is None:
+            manifest = TreeManifest.build(source_folder)
+        dest_index = destination_index(manifest, os.path.join(source_folder, "JSON_METADATA"))
         moved_count = 0
+        moved = []
         
-        for dirpath, dirnames, filenames in os.walk(source_folder):
-             # Prune search: Don't descend into the destination folder
-            dirnames[:] = [d for d in dirnames if d != 'JSON_METADATA']
-
-            for filename in filenames:
-                if any(filename.endswith(pattern) for pattern in json_patterns):
-                    source_file = os.path.join(dirpath, filename)
-                    dest_path = os.path.join(json_folder, filename)
-                     # Handle potential duplicate filenames in the destination
-                    counter = 1
-                    base_dest_path = dest_path
-                    while os.path.exists(dest_path):
-                         name, ext = os.path.splitext(base_dest_path)
-                         dest_path = f"{name}_{counter}{ext}"
-                         counter += 1
-                         
-                    try:
-                        shutil.move(source_file, dest_path)
-                        moved_count += 1
-                    except Exception as e:
-                        log(f"  ✗ Failed to move {filename} to JSON_METADATA: {e}", "error")
+        # Moves only add to dest_index, never to the indexes being iterated
+        for dirpath, filename in manifest.sidecars():
+            source_file = os.path.join(dirpath, filename)
+            # Handle potential duplicate filenames in the destination
+            dest_path = unique_destination(dest_index, filename)
+                 
+            try:
+                with stage_timer('move.file'):
+                    shutil.move(source_file, dest_path)
+                moved_count += 1
+                if journal is not None:
+                    moved.append(source_file)
+                    if len(moved) >= FILE_TIME_BATCH_SIZE:
+                        journal.mark(moved, JobJournal.MOVED)
+                        moved.clear()
+            except Exception as e:
+                log(f"  ✗ Failed to move {filename} to JSON_METADATA: {e}", "error")
+
+        if journal is not None:
+            journal.mark(moved, JobJournal.MOVED)
         
         if moved_count > 0:
             log(f"✓ Organized {moved_count} JSON files into JSON_METADATA", "success")
@@ -240,194 +1159,1574 @@ def organize_json_files(source_folder):
         log(f"✗ Error organizing JSON files: {str(e)}\n", "error")
 
 
+# --- Persistent ExifTool Session ---
+# Starting Perl and loading the ExifTool modules costs far more than the
+# write itself, so one process is kept open and fed commands via -stay_open.
+
+def escape_c(value):
+    """Escapes a tag value for ExifTool's -ec option (argfiles are line based)."""
+    escaped = []
+    for ch in str(value):
+        if ch == '\\':
+            escaped.append('\\\\')
+        elif ch == '\n':
+            escaped.append('\\n')
+        elif ch == '\r':
+            escaped.append('\\r')
+        elif ch == '\t':
+            escaped.append('\\t')
+        elif ord(ch) < 0x20:
+            escaped.append(f'\\x{ord(ch):02x}')
+        else:
+            escaped.append(ch)
+    return ''.join(escaped)
+
+
+class ExifToolSession:
+    """Wraps one long-lived `exiftool -stay_open True -@ -` process.
+
+    Each call to execute() writes one command (one argument per line) followed
+    by -execute<N>, then reads stdout up to the {ready<N>} sentinel and stderr
+    up to a matching -echo4 marker carrying the command's exit status.
+    """
+
+    def __init__(self, exiftool_cmd):
+        self.exiftool_cmd = list(exiftool_cmd)
+        self.process = None
+        self._stderr_lines = None
+        self._counter = 0
+
+    def start(self):
+        with stage_timer('exiftool.spawn'):
+            self.process = subprocess.Popen(
+                self.exiftool_cmd + ['-stay_open', 'True', '-@', '-'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding='utf-8', errors='replace'
+            )
+        # Drain stderr on a thread so a chatty file can never fill the pipe
+        # while we are blocked waiting on stdout.
+        self._stderr_lines = queue.Queue()
+        reader = threading.Thread(target=self._read_stderr, args=(self.process.stderr,), daemon=True)
+        reader.start()
+        return self
+
+    def _read_stderr(self, stream):
+        for line in stream:
+            self._stderr_lines.put(line)
+        self._stderr_lines.put(None) # EOF
+
+    def execute(self, args):
+        """Runs one ExifTool command and returns a subprocess.CompletedProcess."""
+        if self.process is None or self.process.poll() is not None:
+            raise RuntimeError("ExifTool session is not running")
+
+        self._counter += 1
+        ready = f'{{ready{self._counter}}}'
+        lines = [str(arg) for arg in args]
+        for line in lines:
+            if '\n' in line or '\r' in line:
+                raise ValueError(f"ExifTool argument contains a newline: {line!r}")
+        lines += ['-echo4', f'{ready}${{status}}', f'-execute{self._counter}']
+        self.process.stdin.write('\n'.join(lines) + '\n')
+        self.process.stdin.flush()
+
+        stdout_lines = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("ExifTool session exited unexpectedly")
+            if line.rstrip('\r\n') == ready:
+                break
+            stdout_lines.append(line)
+
+        stderr_lines = []
+        returncode = 1
+        while True:
+            line = self._stderr_lines.get()
+            if line is None:
+                raise RuntimeError("ExifTool session exited unexpectedly")
+            stripped = line.rstrip('\r\n')
+            if stripped.startswith(ready):
+                status = stripped[len(ready):]
+                returncode = int(status) if status.isdigit() else 1
+                break
+            stderr_lines.append(line)
+
+        return subprocess.CompletedProcess(args, returncode, ''.join(stdout_lines), ''.join(stderr_lines))
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            if self.process.poll() is None:
+                self.process.stdin.write('-stay_open\nFalse\n')
+                self.process.stdin.flush()
+                self.process.stdin.close()
+                self.process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        finally:
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class InFlightWindow:
+    """Submitted work in submission order, with the media files each item writes.
+
+    Two sidecars can resolve to the same media file. Callers pop (and wait
+    for) older items while busy() reports an overlap, so two ExifTool
+    processes never rewrite one file at once and the later sidecar wins,
+    as in a serial run.
+    """
+
+    def __init__(self):
+        self._entries = deque()
+        self._keys = {}  # media key -> number of items in the window writing it
+
+    def __len__(self):
+        return len(self._entries)
+
+    def busy(self, keys):
+        return any(key in self._keys for key in keys)
+
+    def append(self, item, future, keys=()):
+        self._entries.append((item, future, keys))
+        for key in keys:
+            self._keys[key] = self._keys.get(key, 0) + 1
+
+    def popleft(self):
+        item, future, keys = self._entries.popleft()
+        for key in keys:
+            if self._keys[key] == 1:
+                del self._keys[key]
+            else:
+                self._keys[key] -= 1
+        return item, future
+
+
+class ExifToolPool:
+    """A fixed set of ExifToolSession workers shared by a thread pool.
+
+    run() hands jobs out to whichever session is idle and yields
+    (job, result) pairs in submission order, where result is the
+    CompletedProcess or the exception raised while running the job.
+    With key, jobs with equal key(job) never run at the same time.
+    """
+
+    def __init__(self, exiftool_cmd, workers):
+        self.exiftool_cmd = list(exiftool_cmd)
+        self.workers = workers
+        self._idle = None
+        self._executor = None
+        self._spawned = 0
+        self._spawn_lock = threading.Lock()
+
+    def start(self, lazy=False):
+        """Starts every session now, or with lazy, each one when a job first needs it."""
+        self._idle = queue.Queue()
+        if not lazy:
+            try:
+                for _ in range(self.workers):
+                    self._idle.put(ExifToolSession(self.exiftool_cmd).start())
+            except Exception:
+                self.close()
+                raise
+            self._spawned = self.workers
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._spawn_lock:
+            spawn = self._spawned < self.workers
+            if spawn:
+                self._spawned += 1
+        if not spawn:
+            return self._idle.get()
+        try:
+            return ExifToolSession(self.exiftool_cmd).start()
+        except Exception:
+            with self._spawn_lock:
+                self._spawned -= 1
+            raise
+
+    def _execute(self, args):
+        session = self._acquire()
+        try:
+            with stage_timer('exiftool.command'):
+                return session.execute(args)
+        except RuntimeError:
+            # Replace a dead session so the rest of the batch keeps its worker
+            session.close()
+            session = ExifToolSession(self.exiftool_cmd).start()
+            raise
+        finally:
+            self._idle.put(session)
+
+    def run(self, jobs, key=None, local=None):
+        """With local, local(job) runs first (in order with the jobs in flight)
+        and returns a result, or None to send the job to ExifTool."""
+        # Keep a bounded window of jobs in flight so results stream back in order
+        # without queueing a future for every file up front.
+        window = InFlightWindow()
+        for job in jobs:
+            keys = (key(job),) if key is not None else ()
+            while window.busy(keys):
+                yield self._collect(*window.popleft())
+            result = local(job) if local is not None else None
+            if result is not None:
+                future = Future()
+                future.set_result(result)
+            else:
+                future = self._executor.submit(self._execute, job.cmd_args)
+            window.append(job, future, keys)
+            if len(window) >= self.workers * 4:
+                yield self._collect(*window.popleft())
+        while window:
+            yield self._collect(*window.popleft())
+
+    @staticmethod
+    def _collect(job, future):
+        try:
+            return job, future.result()
+        except Exception as e:
+            return job, e
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._idle is not None:
+            while not self._idle.empty():
+                self._idle.get_nowait().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# --- Argfile Batches ---
+# Without -stay_open, one ExifTool process can still run many commands from a
+# single -@ argfile separated by -execute. -echo2/-echo4 markers around each
+# command attribute the stderr output and exit status to the right file.
+
+def run_argfile_chunk(exiftool_cmd, chunk):
+    """Runs a list of jobs as one `exiftool -@ argfile`; returns [(job, result)]."""
+    lines = []
+    for n, job in enumerate(chunk):
+        lines += ['-echo2', f'{{begin{n}}}']
+        lines += [str(arg) for arg in job.cmd_args]
+        lines += ['-echo4', f'{{end{n}}}${{status}}', '-execute']
+
+    fd, argfile = tempfile.mkstemp(suffix='.args', text=True)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        with stage_timer('exiftool.argfile_chunk'):
+            result = subprocess.run(exiftool_cmd + ['-@', argfile], capture_output=True,
+                                    text=True, encoding='utf-8', errors='replace')
+    finally:
+        os.remove(argfile)
+
+    stderr_lines = {}
+    returncodes = {}
+    current = None
+    for line in result.stderr.splitlines(keepends=True):
+        stripped = line.rstrip('\r\n')
+        if stripped.startswith('{begin') and stripped.endswith('}') and stripped[6:-1].isdigit():
+            current = int(stripped[6:-1])
+            stderr_lines[current] = []
+        elif stripped.startswith('{end') and stripped[4:].partition('}')[0].isdigit():
+            n, _, status = stripped[4:].partition('}')
+            returncodes[int(n)] = int(status) if status.isdigit() else 1
+            current = None
+        elif current is not None:
+            stderr_lines[current].append(line)
+
+    results = []
+    for n, job in enumerate(chunk):
+        if n not in returncodes:
+            error = RuntimeError(f"ExifTool exited with code {result.returncode} before finishing this file")
+            results.append((job, error))
+        else:
+            results.append((job, subprocess.CompletedProcess(
+                job.cmd_args, returncodes[n], '', ''.join(stderr_lines.get(n, [])))))
+    return results
+
+
+def iter_chunks(items, chunk_size):
+    """Yields lists of up to chunk_size consecutive items from any iterable."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_argfile_chunks(exiftool_cmd, jobs, chunk_size, workers):
+    """Splits jobs into argfile chunks run on `workers` processes; yields results in order."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Only a couple of chunks per worker are in flight, so jobs can be a stream
+        window = InFlightWindow()
+        for chunk in iter_chunks(jobs, chunk_size):
+            # A chunk runs its jobs in order; across chunks, a file still being written waits
+            keys = {media_key(job) for job in chunk}
+            while window.busy(keys):
+                yield from window.popleft()[1].result()
+            window.append(chunk, executor.submit(run_argfile_chunk, exiftool_cmd, chunk), keys)
+            if len(window) > workers:
+                yield from window.popleft()[1].result()
+        while window:
+            yield from window.popleft()[1].result()
+
+
+# --- Filesystem Time Stage ---
+# On disk, FileModifyDate is just utime(); doing it here instead of through
+# ExifTool lets every engine (native ones included) set file times, in batches
+# after the content writes so a rewrite can't clobber them.
+
+FILE_TIME_BATCH_SIZE = 500
+
+# ExifTool can only set FileCreateDate (birth time) on these systems
+SETS_FILE_CREATE_DATE = platform.system() in ('Windows', 'Darwin')
+
+
+def file_time_ns(datetime_str):
+    """EXIF date string -> ns since the epoch, read as local time like a bare FileModifyDate."""
+    return int(time.mktime(time.strptime(datetime_str, '%Y:%m:%d %H:%M:%S'))) * 1_000_000_000
+
+
+def apply_file_times(pending):
+    """Sets access/modify time for [(path, datetime_str)]; returns [(path, error)]."""
+    failures = []
+    for path, datetime_str in pending:
+        try:
+            ns = file_time_ns(datetime_str)
+            with stage_timer('file_times.utime'):
+                os.utime(path, ns=(ns, ns))
+        except (OSError, ValueError, OverflowError) as e:
+            failures.append((path, e))
+    return failures
+
+
+def apply_file_create_dates(exiftool_cmd, pending, is_windows):
+    """Sets FileCreateDate for [(path, datetime_str)] through ExifTool, one
+    argfile run per FILE_TIME_BATCH_SIZE files, for the engines that write
+    without ExifTool; does nothing where SETS_FILE_CREATE_DATE is False."""
+    if not SETS_FILE_CREATE_DATE:
+        return
+    common_args = ['-q', '-q']
+    if is_windows:
+        common_args += ['-charset', 'filename=utf8']
+    for chunk in iter_chunks(pending, FILE_TIME_BATCH_SIZE):
+        lines = []
+        for path, datetime_str in chunk:
+            lines += [f'-FileCreateDate={datetime_str}', path, '-execute']
+        fd, argfile = tempfile.mkstemp(suffix='.args', text=True)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            with stage_timer('exiftool.create_dates'):
+                result = subprocess.run(exiftool_cmd + ['-@', argfile, '-common_args'] + common_args,
+                                        capture_output=True, text=True, encoding='utf-8', errors='replace')
+        except OSError as e:
+            log(f"⚠️ Could not set file creation dates: {e}", "warning")
+            return
+        finally:
+            os.remove(argfile)
+        for line in result.stderr.splitlines():
+            if line.startswith('Error'):
+                log(f"⚠️ Could not set file creation date: {line}", "warning")
+
+
+# --- Job Journal ---
+# A SQLite file in the source folder remembers every planned job and how far
+# it got, so --resume can skip finished work after a crash or a closed app.
+# Outcomes are committed every FILE_TIME_BATCH_SIZE files or JOURNAL_COMMIT_INTERVAL
+# seconds, whichever comes first; a run that finishes without errors deletes it.
+
+JOURNAL_COMMIT_INTERVAL = 2.0
+
+class JobJournal:
+    """Per-sidecar job states for one source folder, stored in SQLite."""
+
+    FILENAME = '.metadata_toolkit_journal.sqlite'
+
+    PENDING = 'pending'
+    WRITTEN = 'written'
+    FAILED = 'failed'
+    MOVED = 'moved'
+
+    def __init__(self, source_folder, resume=False):
+        self.source_folder = source_folder
+        self.path = os.path.join(source_folder, self.FILENAME)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " json_path TEXT PRIMARY KEY,"
+            " media_file TEXT,"
+            " state TEXT NOT NULL,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        if not resume:
+            self.conn.execute("DELETE FROM jobs")
+        self.conn.commit()
+
+    def key(self, path):
+        """Paths are stored relative to the source folder so a remounted library still matches."""
+        return os.path.relpath(path, self.source_folder)
+
+    def completed(self):
+        rows = self.conn.execute(
+            "SELECT json_path FROM jobs WHERE state IN (?, ?)", (self.WRITTEN, self.MOVED))
+        return {row[0] for row in rows}
+
+    def record_planned(self, jobs):
+        """Records each job as pending as it passes through to the write stage.
+
+        The rows are committed with the next mark(), which always follows.
+        """
+        for job in jobs:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO jobs (json_path, media_file, state, error, updated_at)"
+                " VALUES (?, ?, ?, NULL, ?)",
+                (self.key(job.json_path), self.key(job.media_file), self.PENDING, time.time()))
+            yield job
+
+    def mark(self, json_paths, state):
+        if not json_paths:
+            return
+        now = time.time()
+        with stage_timer('journal.commit'):
+            self.conn.executemany(
+                "UPDATE jobs SET state = ?, error = NULL, updated_at = ? WHERE json_path = ?",
+                [(state, now, self.key(path)) for path in json_paths])
+            self.conn.commit()
+
+    def mark_failed(self, failures):
+        """failures is a list of (json_path, error text)."""
+        if not failures:
+            return
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE json_path = ?",
+            [(self.FAILED, error, now, self.key(path)) for path, error in failures])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def discard(self):
+        """Closes and deletes the journal, once nothing is left to resume."""
+        self.conn.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            log(f"⚠️ Could not remove the job journal {self.path}: {e}", "warning")
+
+
+# --- Skip Unchanged Files ---
+# --only-changed reads the current values back in bulk (one -fast2 -json call
+# per directory chunk) and drops jobs whose file already holds the planned tags.
+
+ReadbackJob = namedtuple('ReadbackJob', ['jobs', 'cmd_args'])  # one bulk read, run like a write job
+
+READBACK_TAGS = ['-DateTimeOriginal', '-QuickTime:CreateDate', '-OffsetTimeOriginal',
+                 '-GPSLatitude', '-GPSLongitude', '-Description']
+GPS_TOLERANCE = 1e-5  # degrees, about a metre; EXIF stores rounded rationals
+
+
+def readback_chunks(jobs, chunk_size):
+    """Splits a job stream into runs from the same directory of at most chunk_size."""
+    chunk = []
+    for job in jobs:
+        if chunk and (len(chunk) >= chunk_size or
+                      job.media_directory != chunk[0].media_directory):
+            yield chunk
+            chunk = []
+        chunk.append(job)
+    if chunk:
+        yield chunk
+
+
+def job_is_current(job, current):
+    """True when the values ExifTool read back already match what the job would write."""
+    quicktime = is_quicktime(job.media_name)
+    # The native engine patches only the header dates of QuickTime files, with no
+    # DateTimeOriginal, so their movie header CreateDate (which every engine writes) is compared
+    date_tag = 'CreateDate' if quicktime else 'DateTimeOriginal'
+    if str(current.get(date_tag, ''))[:19] != job.datetime_str:
+        return False
+    # QuickTime files have nowhere to keep OffsetTimeOriginal, so it is not compared for them
+    if (job.offset_str is not None and not quicktime
+            and current.get('OffsetTimeOriginal') != job.offset_str):
+        return False
+    if job.gps is not None:
+        try:
+            latitude = float(current['GPSLatitude'])
+            longitude = float(current['GPSLongitude'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        if abs(latitude - job.gps[0]) > GPS_TOLERANCE or abs(longitude - job.gps[1]) > GPS_TOLERANCE:
+            return False
+    if job.description and str(current.get('Description', '')) != job.description:
+        return False
+    return True
+
+
+def filter_changed_jobs(jobs, exiftool_cmd, workers, chunk_size, is_windows, stats=None):
+    """Yields the jobs whose media file differs from the planned values,
+    counting the others in stats.unchanged.
+
+    Anything that cannot be read back is kept, so a failed read only costs a rewrite.
+    """
+    def read_jobs():
+        for chunk in readback_chunks(jobs, chunk_size):
+            cmd_args = ['-fast2', '-json', '-n']
+            if is_windows:
+                cmd_args += ['-charset', 'filename=utf8']
+            cmd_args += READBACK_TAGS
+            cmd_args += [job.media_file for job in chunk]
+            yield ReadbackJob(chunk, cmd_args)
+
+    read = 0
+    changed = 0
+    with ExifToolPool(exiftool_cmd, workers).start() as pool:
+        for read_job, result in pool.run(read_jobs()):
+            current_by_path = {}
+            if not isinstance(result, Exception) and result.stdout.strip():
+                try:
+                    for entry in json.loads(result.stdout):
+                        current_by_path[os.path.normcase(os.path.normpath(entry.get('SourceFile', '')))] = entry
+                except (json.JSONDecodeError, AttributeError):
+                    current_by_path = {}
+            for job in read_job.jobs:
+                read += 1
+                current = current_by_path.get(os.path.normcase(os.path.normpath(job.media_file)))
+                if current is None or not job_is_current(job, current):
+                    changed += 1
+                    yield job
+                elif stats is not None:
+                    stats.unchanged += 1
+    log(f"✓ {read - changed} files already up to date, {changed} written", "success")
+
+
+# --- Pipeline ---
+# Discovery, sidecar parsing, media matching and tag planning each run on their
+# own thread, handing items on through bounded queues; the write engine pulls
+# from the last one. Writes start with the first sidecar found and no stage
+# ever holds more than PIPELINE_QUEUE_SIZE items.
+
+PIPELINE_QUEUE_SIZE = 256
+
+_STAGE_DONE = object()
+
+# Per-thread state set before a stage's target runs (RunProfiler's thread hook)
+_thread_state = threading.local()
+
+
+class _StageFailed:
+    def __init__(self, error):
+        self.error = error
+
+
+class StageOutput:
+    """Iterator over a stage's results, as they arrive."""
+
+    def __init__(self, results):
+        self._results = results
+        self._finished = False
+
+    def _take(self, block=True):
+        result = self._results.get(block)
+        if result is _STAGE_DONE:
+            self._finished = True
+        elif isinstance(result, _StageFailed):
+            raise result.error
+        return result
+
+    def __iter__(self):
+        while not self._finished:
+            result = self._take()
+            if result is not _STAGE_DONE:
+                yield result
+
+    def batches(self, max_size):
+        """Yields lists of results: waits for one, then adds whatever is already queued."""
+        while not self._finished:
+            result = self._take()
+            if result is _STAGE_DONE:
+                return
+            batch = [result]
+            while len(batch) < max_size:
+                try:
+                    result = self._take(block=False)
+                except queue.Empty:
+                    break
+                if result is _STAGE_DONE:
+                    break
+                batch.append(result)
+            yield batch
+
+
+def pipeline_stage(func, items, maxsize=PIPELINE_QUEUE_SIZE, workers=1, expand=False):
+    """Runs func over items on a background thread; returns a StageOutput over
+    the non-None results (each element of them with expand=True). With
+    workers > 1, func runs on a thread pool with a bounded window and results
+    still come out in input order. An exception in the stage is re-raised in
+    the consumer.
+    """
+    results = queue.Queue(maxsize)
+
+    def put(result):
+        if expand:
+            for element in result:
+                results.put(element)
+        elif result is not None:
+            results.put(result)
+
+    def run():
+        try:
+            profiler_error = getattr(_thread_state, 'profiler_error', None)
+            if profiler_error is not None:
+                raise profiler_error
+            if workers == 1:
+                for item in items:
+                    put(func(item))
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    window = deque()
+                    for item in items:
+                        window.append(executor.submit(func, item))
+                        if len(window) >= workers * 4:
+                            put(window.popleft().result())
+                    while window:
+                        put(window.popleft().result())
+        except BaseException as e:
+            results.put(_StageFailed(e))
+        else:
+            results.put(_STAGE_DONE)
+
+    # Daemon: if the consumer gives up (e.g. ExifTool missing), blocked stages must not keep the process alive
+    threading.Thread(target=run, daemon=True).start()
+
+    return StageOutput(results)
+
+
+class PlanStats:
+    """Counters for the planning stages; each attribute is only written by one stage."""
+
+    def __init__(self):
+        self.sidecars = 0
+        self.resumed = 0
+        self.walk_done = False
+        self.parse_errors = 0
+        self.no_timestamp = 0
+        self.no_media = 0
+        self.plan_errors = 0
+        self.planned = 0
+        self.unchanged = 0
+
+    def dropped(self):
+        """Sidecars that left the pipeline before reaching a write engine."""
+        return self.parse_errors + self.no_timestamp + self.no_media + self.plan_errors + self.unchanged
+
+
+class PhotoJob:
+    """One sidecar and its media file on their way through the pipeline.
+
+    The walk creates it from a (directory, sidecar filename) pair; parsing
+    adds the sidecar fields, matching the media file and planning the local
+    time and ExifTool arguments, and fields a stage has not filled yet are
+    None. Paths are kept as a directory plus a basename, where the directory
+    is the manifest's own path string, so every job from one folder shares a
+    single copy of it instead of holding full path strings.
+    """
+
+    __slots__ = ('directory', 'sidecar_name', 'media_directory', 'media_name',
+                 'timestamp', 'latitude', 'longitude', 'description',
+                 'datetime_str', 'offset_str', 'timezone_label', 'cmd_args')
+
+    def __init__(self, directory, sidecar_name):
+        self.directory = directory
+        self.sidecar_name = sidecar_name
+        self.media_directory = None
+        self.media_name = None
+        self.timestamp = None
+        self.latitude = None
+        self.longitude = None
+        self.description = ''
+        self.datetime_str = None
+        self.offset_str = None
+        self.timezone_label = None
+        self.cmd_args = None
+
+    @property
+    def json_path(self):
+        return os.path.join(self.directory, self.sidecar_name)
+
+    @property
+    def media_file(self):
+        return os.path.join(self.media_directory, self.media_name)
+
+    @property
+    def gps(self):
+        """(latitude, longitude) when both are valid and non-zero, else None."""
+        if (self.latitude is not None and self.longitude is not None
+                and self.latitude != 0.0 and self.longitude != 0.0):
+            return self.latitude, self.longitude
+        return None
+
+
+def media_key(job):
+    """Names the file a job writes; case-folded, as the macOS and Windows filesystems ignore case."""
+    return os.path.normpath(job.media_file).lower()
+
+
+SIDECAR_READ_WORKERS = 8  # sidecar reads are latency-bound (network shares), not CPU-bound
+
+
+def read_sidecar(job):
+    """Read stage (thread pool): job -> (job, raw sidecar bytes or the OSError)."""
+    try:
+        with stage_timer('sidecar.read'), open(job.json_path, 'rb') as f:
+            return job, f.read()
+    except OSError as e:
+        return job, e
+
+
+def load_sidecar(job, raw, stats):
+    """Parse stage: fills in only the sidecar fields the tag plan needs; returns the job or None."""
+    try:
+        if isinstance(raw, OSError):
+            raise raw
+        with stage_timer('sidecar.parse'):
+            data = json.loads(raw)
+
+        # Check for essential time data
+        photo_taken_time = data.get('photoTakenTime')
+        if not photo_taken_time or 'timestamp' not in photo_taken_time:
+            log(f"⚠️ Missing timestamp in: {job.sidecar_name}", "warning")
+            stats.no_timestamp += 1
+            return None
+
+        gps_data = data.get('geoData', {})
+        job.timestamp = photo_taken_time['timestamp']
+        job.latitude = gps_data.get('latitude')
+        job.longitude = gps_data.get('longitude')
+        job.description = data.get('description', '') # Handle potentially missing description
+        return job
+
+    except json.JSONDecodeError as json_e:
+        log(f"✗ JSON decode error in: {job.sidecar_name} | {json_e}", "error")
+    except FileNotFoundError:
+         # Catch if JSON file disappears between listing and processing
+         log(f"✗ File not found (moved?): {job.sidecar_name}", "error")
+    except Exception as e:
+        log(f"✗ Unexpected file error: {job.sidecar_name} | {e}", "error")
+    stats.parse_errors += 1
+    return None
+
+
+def match_sidecar(job, manifest, stats):
+    """Match stage: attaches the media file, or drops the job when there is none."""
+    with stage_timer('match.find_media_file'):
+        found = find_media(job.directory, job.sidecar_name, manifest.index)
+    if found is None:
+        log(f"⚠️  No media file found for: {job.sidecar_name}", "warning")
+        stats.no_media += 1
+        return None
+    # No exists() re-checks: nothing is moved until every write has finished
+    job.media_directory, job.media_name = found
+    return job
+
+
+PLAN_BATCH_SIZE = PIPELINE_QUEUE_SIZE
+
+
+def plan_jobs(jobs, timezone_mode, is_windows, stats, tz_name=None, tz_resolver=None):
+    """Tag plan stage: plans a batch of matched jobs, formatting the
+    timestamps of each zone in one format_local_datetimes call; returns
+    the jobs that could be planned."""
+    # Resolve each job's zone first, then convert per zone
+    by_zone = {}  # zone key -> [(job position, utc timestamp)]
+    zone_info = {}  # zone key -> (OffsetTable, label, writes OffsetTimeOriginal)
+    for position, job in enumerate(jobs):
+        try:
+            job_tz = tz_resolver(job.latitude, job.longitude) if tz_resolver is not None else tz_name
+            if job_tz is not None:
+                key = job_tz
+                if key not in zone_info:
+                    zone_info[key] = (get_zone_table(job_tz), job_tz, True)
+            elif timezone_mode == 'pacific':
+                key = 'pacific'
+                zone_info[key] = (PACIFIC_OFFSETS, "PDT/PST", False)
+            else:
+                key = 'utc'
+                zone_info[key] = (UTC_OFFSETS, "UTC", False)
+            # Skip if timestamp conversion failed
+            try:
+                utc_ts = int(job.timestamp)
+                if not is_formattable_timestamp(utc_ts):
+                    raise ValueError(job.timestamp)
+            except (ValueError, TypeError):
+                conversion = 'Pacific' if key == 'pacific' else 'UTC' if key == 'utc' else key
+                log(f"Invalid timestamp for {conversion} conversion: {job.timestamp}", "error")
+                stats.plan_errors += 1
+                continue
+        except Exception as e:
+            log(f"✗ Unexpected file error: {job.sidecar_name} | {e}", "error")
+            stats.plan_errors += 1
+            continue
+        by_zone.setdefault(key, []).append((position, utc_ts))
+
+    planned = [None] * len(jobs)
+    for key, entries in by_zone.items():
+        table, timezone_label, with_offset = zone_info[key]
+        datetime_strs, offsets = format_local_datetimes([utc_ts for _, utc_ts in entries], table)
+        for (position, _), datetime_str, offset in zip(entries, datetime_strs, offsets):
+            job = jobs[position]
+            try:
+                offset_str = format_utc_offset(offset) if with_offset else None
+                planned[position] = build_job(job, datetime_str, offset_str, timezone_label, is_windows)
+            except Exception as e:
+                log(f"✗ Unexpected file error: {job.sidecar_name} | {e}", "error")
+                stats.plan_errors += 1
+    planned = [job for job in planned if job is not None]
+    stats.planned += len(planned)
+    return planned
+
+
+def build_job(job, datetime_str, offset_str, timezone_label, is_windows):
+    """Sets a matched job's local time and ExifTool arguments; returns the job."""
+    media_file = job.media_file
+    gps = job.gps
+    description = job.description
+
+    # Construct exiftool command arguments (tag values are C-escaped via -ec,
+    # since the session passes one argument per line)
+    cmd_args = ['-overwrite_original', '-q', '-ec']
+    if is_windows:
+        cmd_args += ['-charset', 'filename=utf8']
+    cmd_args.append(f'-DateTimeOriginal={datetime_str}')
+    if offset_str is not None:
+        # Lets readers recover the absolute time; ExifTool ignores it for QuickTime files
+        cmd_args.append(f'-OffsetTimeOriginal={offset_str}')
+    # FileModifyDate is set by the file time stage after the write;
+    # creation time has no portable syscall, so ExifTool keeps it where it exists
+    if SETS_FILE_CREATE_DATE:
+        cmd_args.append(f'-FileCreateDate={datetime_str}')
+    if is_quicktime(job.media_name):
+        # Movie/track/media header dates, which players read for videos
+        cmd_args.append(f'-CreateDate={datetime_str}')
+        cmd_args.append(f'-TrackCreateDate={datetime_str}')
+        cmd_args.append(f'-MediaCreateDate={datetime_str}')
+
+    # Add GPS tags only if latitude and longitude are valid and non-zero
+    if gps is not None:
+        latitude, longitude = gps
+        cmd_args.append(f'-GPSLatitude={latitude}')
+        cmd_args.append(f'-GPSLongitude={longitude}')
+        # Optional: Add altitude if needed and available, checking validity
+        # altitude = gps_data.get('altitude')
+        # if altitude is not None:
+        #     cmd_args.append(f'-GPSAltitude={altitude}')
+        # Consider adding Ref tags if needed by target applications
+        cmd_args.append(f'-GPSLatitudeRef={"N" if latitude >= 0 else "S"}')
+        cmd_args.append(f'-GPSLongitudeRef={"E" if longitude >= 0 else "W"}')
+
+
+    if description: # Add description only if it's not empty
+        cmd_args.append(f'-Description={escape_c(description)}')
+
+    cmd_args.append(media_file)
+
+    job.datetime_str = datetime_str
+    job.offset_str = offset_str
+    job.timezone_label = timezone_label
+    job.cmd_args = cmd_args
+    return job
+
+
+# --- Progress Events ---
+# The write engines report finished files through a ProgressTracker, which
+# emits a "progress" log line at most every PROGRESS_INTERVAL seconds. Its
+# "progress" object carries processed/total counts, bytes written, files per
+# second and an ETA for the Electron progress bar. The rate is measured over
+# the last PROGRESS_WINDOW seconds rather than since the start, so the ETA
+# follows the current speed (a slow share, a run of skipped files).
+
+PROGRESS_INTERVAL = 0.5
+PROGRESS_WINDOW = 10.0
+
+
+class ProgressTracker:
+    """Counts finished files and emits throttled progress events.
+
+    With stats (the PlanStats of a streaming run) the total is the number of
+    sidecars found so far, final once the walk is done, and sidecars dropped
+    before the write stage count as processed. Otherwise total is fixed.
+    """
+
+    def __init__(self, total=0, stats=None):
+        self.total = total
+        self.stats = stats
+        self.written = 0
+        self.bytes_written = 0
+        now = time.monotonic()
+        self._samples = deque([(now, 0)])  # (monotonic time, processed) within the window
+        self._last_emit = now
+        self._last_reported = None
+
+    def add(self, count=1, bytes_written=0, force=False):
+        self.written += count
+        self.bytes_written += bytes_written
+        self.emit(force)
+
+    def emit(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_emit < PROGRESS_INTERVAL:
+            return
+
+        if self.stats is not None:
+            processed = self.written + self.stats.dropped()
+            total = self.stats.sidecars - self.stats.resumed
+            total_known = self.stats.walk_done
+        else:
+            processed = self.written
+            total = self.total
+            total_known = True
+        total = max(total, processed)
+        if (processed, total, total_known) == self._last_reported:
+            return
+        self._last_reported = (processed, total, total_known)
+        self._last_emit = now
+
+        samples = self._samples
+        samples.append((now, processed))
+        while len(samples) > 1 and samples[1][0] <= now - PROGRESS_WINDOW:
+            samples.popleft()
+        start_time, start_processed = samples[0]
+        rate = (processed - start_processed) / (now - start_time) if now > start_time else 0.0
+        eta = None
+        if total_known and rate > 0:
+            eta = round((total - processed) / rate, 1)
+
+        text = f"Processed {processed} of {total}{'' if total_known else '+'} files"
+        log(text, "progress", progress={
+            "processed": processed,
+            "total": total,
+            "total_known": total_known,
+            "bytes_written": self.bytes_written,
+            "files_per_second": round(rate, 2),
+            "eta_seconds": eta,
+        })
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+# --- Per-file Write Engines ---
+
+def write_per_file(manifest, timezone_mode, perl_cmd, is_windows, workers=None,
+                   engine='stay-open', chunk_size=500, journal=None, only_changed=False,
+                   scan_cache=None, json_workers=SIDECAR_READ_WORKERS, tz_name=None,
+                   tz_resolver=None):
+    """Walks the tree and writes each sidecar's tags as it is found, through
+    the pipeline stages, on an ExifToolPool, in chunked argfiles ('argfile'),
+    or patching in place first ('native'). Sidecars the journal already records
+    as done are skipped, and with only_changed so are files that already hold
+    the planned values.
+
+    Returns (total_photos, updated_photos, error_photos).
+    """
+    stats = PlanStats()
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    completed = set()
+    if journal is not None:
+        completed = journal.completed()
+        if completed:
+            log(f"↻ Resuming: skipping {len(completed)} files already done", "info")
+
+    def walk_stage():
+        for dirpath, filename in manifest.walk_sidecars(scan_cache):
+            stats.sidecars += 1
+            if completed and journal.key(os.path.join(dirpath, filename)) in completed:
+                stats.resumed += 1
+                continue
+            yield PhotoJob(dirpath, filename)
+        stats.walk_done = True
+        if stats.sidecars:
+            log(f"✓ Found {stats.sidecars} JSON files", "success")
+
+    # --- Plan: walk -> read (pooled) -> parse -> match -> tag plan, one thread each ---
+    found = pipeline_stage(lambda job: job, walk_stage())
+    raw_sidecars = pipeline_stage(read_sidecar, found, workers=json_workers)
+    parsed = pipeline_stage(lambda item: load_sidecar(*item, stats), raw_sidecars)
+    matched = pipeline_stage(lambda job: match_sidecar(job, manifest, stats), parsed)
+    def plan_stage(batch):
+        with stage_timer('plan.batch'):
+            return plan_jobs(batch, timezone_mode, is_windows, stats, tz_name, tz_resolver)
+
+    jobs = pipeline_stage(plan_stage, matched.batches(PLAN_BATCH_SIZE), expand=True)
+
+    if only_changed:
+        log("Reading current metadata before writing...", "info")
+        jobs = filter_changed_jobs(jobs, perl_cmd, workers, chunk_size, is_windows, stats)
+
+    if journal is not None:
+        jobs = journal.record_planned(jobs)
+
+    progress = ProgressTracker(stats=stats)
+
+    # --- Write: fan the jobs out over parallel ExifTool processes ---
+    if engine == 'argfile':
+        log(f"Writing argfile chunks of {chunk_size} files with {workers} ExifTool worker(s)", "info")
+        results = run_argfile_chunks(perl_cmd, jobs, chunk_size, workers)
+        updated_photos, failed = log_write_results(results, journal, progress)
+    elif engine == 'native':
+        log("Patching JPEG and MP4/MOV timestamps in place where possible", "info")
+        updated_photos, failed = log_write_results(write_native(perl_cmd, jobs, workers, is_windows),
+                                                   journal, progress)
+    else:
+        log(f"Using {workers} ExifTool worker(s)", "info")
+        with ExifToolPool(perl_cmd, workers).start() as pool:
+            updated_photos, failed = log_write_results(pool.run(jobs, key=media_key), journal, progress)
+
+    error_photos = stats.parse_errors + stats.plan_errors + failed
+    return stats.planned, updated_photos, error_photos
+
+
+def log_write_results(results, journal=None, progress=None):
+    """Logs (job, result) pairs from a write engine, runs the file time stage
+    on the written files and records outcomes in the journal, in batches;
+    returns (updated, errors). Every result is counted in progress."""
+    updated_photos = 0
+    error_photos = 0
+    pending_times = []
+    written = []
+    failed = []
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal last_flush
+        log_file_time_failures(apply_file_times(pending_times))
+        if journal is not None:
+            journal.mark(written, JobJournal.WRITTEN)
+            journal.mark_failed(failed)
+        pending_times.clear()
+        written.clear()
+        failed.clear()
+        last_flush = time.monotonic()
+
+    for job, result in results:
+        media_file = job.media_file
+        if isinstance(result, RuntimeError):
+            # The ExifTool process died (crash or killed) before finishing this file
+            log(f"✗ ExifTool worker error for {os.path.basename(media_file)}: {result}", "error")
+            error_photos +=1
+            failed.append((job.json_path, str(result)))
+        elif isinstance(result, Exception):
+            log(f"✗ Subprocess error running ExifTool for {os.path.basename(media_file)}: {result}", "error")
+            error_photos +=1
+            failed.append((job.json_path, str(result)))
+        elif result.returncode == 0:
+            log_file(f"✓ {os.path.basename(media_file)} → {job.datetime_str} ({job.timezone_label})",
+                     "success", "✓ Files updated")
+            updated_photos += 1
+            pending_times.append((media_file, job.datetime_str))
+            written.append(job.json_path)
+            if progress is not None:
+                progress.bytes_written += file_size(media_file)
+        else:
+            # Log stderr if available, otherwise just note the error code
+            error_detail = result.stderr.strip() if result.stderr else f"ExifTool exited with code {result.returncode}"
+            log(f"✗ Error processing {os.path.basename(media_file)}: {error_detail}", "error")
+            error_photos += 1
+            failed.append((job.json_path, error_detail))
+        # Slow files (long videos) must not hold back the journal for minutes
+        if (len(pending_times) + len(failed) >= FILE_TIME_BATCH_SIZE
+                or time.monotonic() - last_flush >= JOURNAL_COMMIT_INTERVAL):
+            flush()
+        if progress is not None:
+            progress.add()
+    flush()
+    if progress is not None:
+        progress.emit(force=True)
+    flush_log_summaries()
+    return updated_photos, error_photos
+
+
+def log_file_time_failures(failures):
+    for media_file, error in failures:
+        log(f"⚠️ Could not set file time for {os.path.basename(media_file)}: {error}", "warning")
+
+
+# --- Native Engine ---
+# JPEGs whose EXIF already holds the fields we write, and MP4/MOV files (whose
+# header dates are fixed-width), are patched in place (see native_writers.py);
+# everything else goes through the ExifTool pool.
+
+
+def write_native_job(job):
+    """Tries to apply a job without ExifTool; returns False if it needs the fallback."""
+    media_file = job.media_file
+    lower = job.media_name.lower()
+    # Descriptions are variable-length XMP, which always needs a rewrite
+    if job.description:
+        return False
+    try:
+        if lower.endswith(JPEG_EXTENSIONS):
+            values = {'DateTimeOriginal': job.datetime_str}
+            if job.offset_str is not None:
+                values['OffsetTimeOriginal'] = job.offset_str
+            patched = patch_jpeg_exif(media_file, values, job.gps)
+        elif lower.endswith(QUICKTIME_EXTENSIONS) and job.gps is None:
+            # QuickTime dates are stored as given (no QuickTimeUTC), so parse as UTC
+            timestamp = calendar.timegm(time.strptime(job.datetime_str, '%Y:%m:%d %H:%M:%S'))
+            patched = patch_quicktime_dates(media_file, timestamp)
+        else:
+            patched = False
+        if not patched:
+            return False
+    except OSError:
+        return False
+    return True
+
+
+def write_native(exiftool_cmd, jobs, workers, is_windows):
+    """Yields (job, result) as jobs are patched natively or by the ExifTool fallback."""
+    counts = {'patched': 0, 'fallback': 0}
+    patched = []  # (media file, datetime_str) still needing FileCreateDate
+
+    def patch(job):
+        with stage_timer('native.patch'):
+            done = write_native_job(job)
+        counts['patched' if done else 'fallback'] += 1
+        if done and SETS_FILE_CREATE_DATE:
+            patched.append((job.media_file, job.datetime_str))
+        return subprocess.CompletedProcess(job.cmd_args, 0, '', '') if done else None
+
+    # Fallbacks go to ExifTool as they come; no session starts unless one is needed
+    with ExifToolPool(exiftool_cmd, workers).start(lazy=True) as pool:
+        yield from pool.run(jobs, key=media_key, local=patch)
+    # The fallbacks' ExifTool args carry FileCreateDate; patched files get it in batches
+    apply_file_create_dates(exiftool_cmd, patched, is_windows)
+    if counts['fallback']:
+        log(f"{counts['patched']} files patched natively, {counts['fallback']} needed ExifTool", "info")
+
+
+# --- Whole-tree ExifTool Engine ---
+# ExifTool reads the Takeout JSON itself (PhotoTakenTimeTimestamp, GeoData*,
+# Description), so one -tagsFromFile run per sidecar suffix keeps the whole
+# loop inside a single Perl process. Each run gets exactly the media files
+# that have a sidecar with its suffix, through an -@ argfile, instead of
+# recursing over (and opening) every file in the tree. Only sidecars named
+# exactly <media filename><suffix> are picked up; truncated names need
+# write_per_file.
+
+# TZ values understood by both POSIX libc and the Windows CRT
+TREE_ENGINE_TZ = {'pacific': 'PST8PDT', 'utc': 'UTC0'}
+
+
+def tree_sidecar_variants(manifest):
+    """Counts, per sidecar suffix, the media files that have such a sidecar."""
+    counts = {}
+    for dir_index, filename in manifest.media_files():
+        for pattern in SIDECAR_PATTERNS:
+            if filename + pattern in dir_index.files:
+                counts[pattern] = counts.get(pattern, 0) + 1
+    return counts
+
+
+def tree_pass_files(manifest, pattern):
+    """Yields the path of every media file that has a <media filename><pattern> sidecar."""
+    for dir_index, filename in manifest.media_files():
+        if filename + pattern in dir_index.files:
+            yield os.path.join(dir_index.path, filename)
+
+
+def sidecar_has_timestamp(json_path):
+    """False only for a readable sidecar without photoTakenTime, which the
+    per-file engines skip; unreadable ones are left for ExifTool to report."""
+    try:
+        with open(json_path, 'rb') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return True
+    photo_taken_time = data.get('photoTakenTime') if isinstance(data, dict) else None
+    return isinstance(photo_taken_time, dict) and 'timestamp' in photo_taken_time
+
+
+def tree_file_times(media_files, pattern, table):
+    """[(media file, datetime_str)] for the file time stage, from each file's sidecar.
+
+    ExifTool would set file times to the true instant under TZ; the per-file
+    engines read the local datetime string as system local time, so the tree
+    engine goes through the same stage to match them.
+    """
+    paths = []
+    timestamps = []
+    for media_file in media_files:
+        try:
+            with open(media_file + pattern, 'rb') as f:
+                utc_ts = int(json.load(f)['photoTakenTime']['timestamp'])
+        except (OSError, ValueError, KeyError, TypeError):
+            continue  # ExifTool wrote no date from it either
+        if not is_formattable_timestamp(utc_ts):
+            continue
+        timestamps.append(utc_ts)
+        paths.append(media_file)
+    datetime_strs, _ = format_local_datetimes(timestamps, table)
+    return list(zip(paths, datetime_strs))
+
+
+def tree_engine_args(pattern, with_offset=False):
+    gps_guard = '$_=undef if $_ == 0 or $self->GetValue("{other}") == 0'
+    lat = '${GeoDataLatitude;' + gps_guard.format(other='GeoDataLongitude') + '}'
+    lon = '${GeoDataLongitude;' + gps_guard.format(other='GeoDataLatitude') + '}'
+    args = [
+        '-tagsFromFile', '%d%f.%e' + pattern,
+        '-DateTimeOriginal<PhotoTakenTimeTimestamp',
+        '-QuickTime:CreateDate<PhotoTakenTimeTimestamp',
+        '-QuickTime:TrackCreateDate<PhotoTakenTimeTimestamp',
+        '-QuickTime:MediaCreateDate<PhotoTakenTimeTimestamp',
+        f'-GPSLatitude<{lat}', f'-GPSLatitudeRef<{lat}',
+        f'-GPSLongitude<{lon}', f'-GPSLongitudeRef<{lon}',
+        '-Description<${Description;$_=undef unless length}',
+    ]
+    if with_offset:
+        # The timestamp's UTC offset in the TZ zone, as '+HH:MM'
+        args.append('-OffsetTimeOriginal<${PhotoTakenTimeTimestamp;'
+                    '$_=POSIX::strftime("%z",localtime $_);s/(\\d\\d)$/:$1/}')
+    return args
+
+
+def write_exiftool_tree(source_folder, manifest, timezone_mode, perl_cmd, is_windows, tz_name=None):
+    """Runs one ExifTool pass per sidecar suffix present in the tree.
+    A tz_name is passed to ExifTool as TZ, which needs a POSIX libc.
+
+    Returns (total_photos, updated_photos, error_photos).
+    """
+    variants = tree_sidecar_variants(manifest)
+    updated_photos = 0
+    error_photos = 0
+
+    unmatched = manifest.sidecar_count() - sum(variants.values())
+    if unmatched > 0:
+        log(f"⚠️ {unmatched} sidecars are not named after their media file and are skipped by the tree engine", "warning")
+
+    # Like the per-file engines, leave out files whose sidecar has no timestamp
+    pass_files = {}
+    for pattern in SIDECAR_PATTERNS:
+        if not variants.get(pattern):
+            continue
+        files = []
+        for media_file in tree_pass_files(manifest, pattern):
+            if sidecar_has_timestamp(media_file + pattern):
+                files.append(media_file)
+            else:
+                log(f"⚠️ Missing timestamp in: {os.path.basename(media_file + pattern)}", "warning")
+        if files:
+            pass_files[pattern] = files
+    total_photos = sum(len(files) for files in pass_files.values())
+
+    # -d %s makes ExifTool treat the JSON timestamp as epoch seconds and render
+    # it in the process's local time, which TZ pins to the chosen mode.
+    if tz_name is not None:
+        env = dict(os.environ, TZ=tz_name)
+        timezone_label = tz_name
+        table = get_zone_table(tz_name)
+    else:
+        env = dict(os.environ, TZ=TREE_ENGINE_TZ[timezone_mode])
+        timezone_label = "PDT/PST" if timezone_mode == 'pacific' else "UTC"
+        table = PACIFIC_OFFSETS if timezone_mode == 'pacific' else UTC_OFFSETS
+
+    progress = ProgressTracker(total=total_photos)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n, pattern in enumerate(SIDECAR_PATTERNS):
+            if pattern not in pass_files:
+                continue
+            updated_list = os.path.join(tmp_dir, f'updated{n}.txt')
+            error_list = os.path.join(tmp_dir, f'errors{n}.txt')
+            file_list = os.path.join(tmp_dir, f'files{n}.args')
+            with open(file_list, 'w', encoding='utf-8') as f:
+                for media_file in pass_files[pattern]:
+                    f.write(media_file + '\n')
+
+            cmd_args = ['-d', '%s', '-overwrite_original', '-q', '-q']
+            if is_windows:
+                cmd_args += ['-charset', 'filename=utf8']
+            cmd_args += tree_engine_args(pattern, with_offset=tz_name is not None)
+            # Unchanged files (2) count as updated (8), as an exit status of 0 does for the per-file engines
+            cmd_args += ['-efile10!', updated_list, '-efile!', error_list, '-@', file_list]
+
+            log(f"Running tree pass for *{pattern} ({len(pass_files[pattern])} files)...", "info")
+            with stage_timer('exiftool.tree_pass'):
+                result = subprocess.run(perl_cmd + cmd_args, capture_output=True, text=True,
+                                        encoding='utf-8', errors='replace', env=env)
+
+            updated = read_efile(updated_list)
+            pass_bytes = 0
+            for media_file in updated:
+                log_file(f"✓ {os.path.basename(media_file)} ({timezone_label})", "success", "✓ Files updated")
+                updated_photos += 1
+                pass_bytes += file_size(media_file)
+            for batch in iter_chunks(updated, FILE_TIME_BATCH_SIZE):
+                log_file_time_failures(apply_file_times(tree_file_times(batch, pattern, table)))
+            if SETS_FILE_CREATE_DATE and updated:
+                # Without TZ, so the creation date is read back as system local time too
+                create_args = ['-FileCreateDate<FileModifyDate', '-q', '-q']
+                if is_windows:
+                    create_args += ['-charset', 'filename=utf8']
+                with stage_timer('exiftool.tree_create_dates'):
+                    subprocess.run(perl_cmd + create_args + ['-@', updated_list], capture_output=True)
+            # ExifTool names the failing file in its own stderr message
+            error_photos += len(read_efile(error_list))
+            for line in result.stderr.splitlines():
+                if line.startswith('Error'):
+                    log(f"✗ {line}", "error")
+            flush_log_summaries()
+            # One pass per suffix is the finest grain the tree engine reports at
+            progress.add(len(pass_files[pattern]), pass_bytes, force=True)
+
+    return total_photos, updated_photos, error_photos
+
+
+def read_efile(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return [line.rstrip('\r\n') for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
 # --- Main Processing Function ---
-def process_photos(source_folder, timezone_mode, exiftool_path):
+def exiftool_command(exiftool_path, is_windows):
+    """Determines how to call exiftool based on OS; returns (command, lib dir or None)."""
+    if is_windows:
+        # On Windows, expect exiftool_path to be the .exe
+        return [exiftool_path], None
+    # On macOS/Linux, exiftool is likely a Perl script needing its lib path
+    lib_dir = os.path.join(os.path.dirname(exiftool_path), 'lib')
+    if os.path.isdir(lib_dir):
+        # Command will be: perl -I /path/to/lib /path/to/exiftool ...
+        return ['perl', '-I', lib_dir, exiftool_path], lib_dir
+    # Assume exiftool is executable directly (standalone or in PATH)
+    return [exiftool_path], None
+
+
+def process_photos(source_folder, timezone_mode, exiftool_path, workers=None, engine='stay-open',
+                   chunk_size=500, resume=False, only_changed=False, scan_cache=False,
+                   json_workers=SIDECAR_READ_WORKERS, tz_name=None, tz_default=None, tz_data=None,
+                   profile_path=None):
+    profiler = RunProfiler(profile_path).start() if profile_path else None
     try:
         log("=" * 60)
         
-        json_files = find_json_files(source_folder)
-        
-        if not json_files:
-            log("❌ No JSON metadata files found!", "error")
-            return
-            
-        log(f"✓ Found {len(json_files)} JSON files", "success")
-        log(f"✓ Timezone mode: {timezone_mode.upper()}", "success")
+        if tz_name is not None:
+            log(f"✓ Timezone: {tz_name}", "success")
+        else:
+            log(f"✓ Timezone mode: {timezone_mode.upper()}", "success")
         log("Processing files...\n")
         
-        total_photos = 0
-        updated_photos = 0
-        error_photos = 0
-        
-        # --- Determine how to call exiftool based on OS ---
         is_windows = platform.system() == "Windows"
-        perl_cmd = []
-        lib_dir = None
-
-        if not is_windows:
-            # On macOS/Linux, exiftool is likely a Perl script needing its lib path
-            exiftool_dir = os.path.dirname(exiftool_path)
-            potential_lib_dir = os.path.join(exiftool_dir, 'lib')
-            if os.path.isdir(potential_lib_dir):
-                 lib_dir = potential_lib_dir
-                 # Command will be: perl -I /path/to/lib /path/to/exiftool ...
-                 perl_cmd = ['perl', '-I', lib_dir, exiftool_path]
-            else:
-                 # Assume exiftool is executable directly (standalone or in PATH)
-                 perl_cmd = [exiftool_path]
-        else:
-             # On Windows, expect exiftool_path to be the .exe
-             perl_cmd = [exiftool_path]
-
+        perl_cmd, lib_dir = exiftool_command(exiftool_path, is_windows)
 
         log(f"Using ExifTool command: {' '.join(perl_cmd)}", "info")
         if lib_dir:
              log(f"Using ExifTool lib path: {lib_dir}", "info")
 
 
-        for json_path in json_files:
-            try:
-                # Check if the JSON file still exists (it might have been moved)
-                if not os.path.exists(json_path):
-                     log(f"Skipping already moved JSON: {os.path.basename(json_path)}", "info")
-                     continue
-
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Check for essential time data
-                photo_taken_time = data.get('photoTakenTime')
-                if not photo_taken_time or 'timestamp' not in photo_taken_time:
-                    log(f"⚠️ Missing timestamp in: {os.path.basename(json_path)}", "warning")
-                    continue
-                
-                utc_timestamp = photo_taken_time['timestamp']
-                gps_data = data.get('geoData', {})
-                latitude = gps_data.get('latitude')
-                longitude = gps_data.get('longitude')
-                description = data.get('description', '') # Handle potentially missing description
-                
-                # Get formatted datetime string, handling potential conversion errors
-                datetime_str = None
-                timezone_label = "UTC" # Default
-                if timezone_mode == 'pacific':
-                    datetime_str = get_pacific_datetime(utc_timestamp)
-                    timezone_label = "PDT/PST"
+        if tz_name is not None and engine == 'exiftool-tree' and is_windows:
+            log("✗ --tz needs a per-file engine on Windows (the tree engine relies on POSIX TZ names)", "error")
+            return
+
+        # auto-gps picks a zone per photo, so each job carries its own
+        tz_resolver = None
+        if tz_name == AUTO_GPS_TZ:
+            if engine == 'exiftool-tree':
+                log("✗ --tz auto-gps needs a per-file engine; the tree engine uses one zone for the whole run", "error")
+                return
+            tz_resolver = load_gps_zone_resolver(tz_data, tz_default or DEFAULT_ZONES[timezone_mode])
+            if tz_resolver is None:
+                return
+            tz_name = None
+
+        # One traversal feeds discovery, media matching, separation and organization;
+        # the per-file engines consume it while it is still walking
+        cache = ScanCache(source_folder) if scan_cache else None
+        manifest = TreeManifest(source_folder)
+        if engine == 'exiftool-tree':
+            with stage_timer('phase.walk'):
+                for _ in manifest.walk(cache):
+                    pass
+            finish_scan_cache(cache)
+            cache = None
+            sidecar_count = manifest.sidecar_count()
+            if not sidecar_count:
+                log("❌ No JSON metadata files found!", "error")
+                return
+            log(f"✓ Found {sidecar_count} JSON files", "success")
+
+        # The tree engine has no per-file jobs to journal
+        journal = None
+        if engine != 'exiftool-tree':
+            journal = JobJournal(source_folder, resume=resume)
+        elif resume or only_changed:
+            log("--resume and --only-changed have no effect with the exiftool-tree engine", "warning")
+
+        try:
+            with stage_timer('phase.write'):
+                if engine == 'exiftool-tree':
+                    total_photos, updated_photos, error_photos = write_exiftool_tree(
+                        source_folder, manifest, timezone_mode, perl_cmd, is_windows, tz_name)
                 else:
-                    datetime_str = get_utc_datetime(utc_timestamp)
-                
-                if datetime_str is None: # Skip if timestamp conversion failed
-                    error_photos +=1
-                    continue
-
-                media_file = find_media_file(json_path)
-                
-                if not media_file:
-                    log(f"⚠️  No media file found for: {os.path.basename(json_path)}", "warning")
-                    continue
-                
-                 # Check if the media file still exists (it might have been moved)
-                if not os.path.exists(media_file):
-                    log(f"Skipping already moved media file: {os.path.basename(media_file)} referenced by {os.path.basename(json_path)}", "info")
-                    continue
-
-                total_photos += 1
-                
-                # Construct exiftool command arguments
-                cmd_args = ['-overwrite_original', '-q']
-                cmd_args.append(f'-DateTimeOriginal={datetime_str}')
-                cmd_args.append(f'-FileCreateDate={datetime_str}')
-                cmd_args.append(f'-FileModifyDate={datetime_str}')
-                
-                # Add GPS tags only if latitude and longitude are valid and non-zero
-                if latitude is not None and longitude is not None and latitude != 0.0 and longitude != 0.0:
-                    cmd_args.append(f'-GPSLatitude={latitude}')
-                    cmd_args.append(f'-GPSLongitude={longitude}')
-                    # Optional: Add altitude if needed and available, checking validity
-                    # altitude = gps_data.get('altitude')
-                    # if altitude is not None:
-                    #     cmd_args.append(f'-GPSAltitude={altitude}')
-                    # Consider adding Ref tags if needed by target applications
-                    cmd_args.append(f'-GPSLatitudeRef={"N" if latitude >= 0 else "S"}')
-                    cmd_args.append(f'-GPSLongitudeRef={"E" if longitude >= 0 else "W"}')
-
-                
-                if description: # Add description only if it's not empty
-                    # Ensure description is properly handled for command line (basic escaping)
-                    # For more robust handling consider base64 or temporary files if descriptions are complex
-                    # Simple approach: Replace potential problematic chars if needed, though exiftool handles many cases
-                    cmd_args.append(f'-Description={description}') 
-                
-                cmd_args.append(media_file)
-
-                # Combine base command (perl or exe) with arguments
-                full_cmd = perl_cmd + cmd_args
+                    total_photos, updated_photos, error_photos = write_per_file(
+                        manifest, timezone_mode, perl_cmd, is_windows, workers,
+                        engine=engine, chunk_size=chunk_size, journal=journal,
+                        only_changed=only_changed, scan_cache=cache, json_workers=json_workers,
+                        tz_name=tz_name, tz_resolver=tz_resolver)
+        except FileNotFoundError:
+            log(f"✗ Error: ExifTool (or Perl) not found at the specified path: {perl_cmd[0]}", "error")
+            if journal is not None:
+                journal.close()
+            return
 
-                try:
-                     # Use utf-8 for stderr decoding
-                    result = subprocess.run(full_cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
-                
-                    if result.returncode == 0:
-                        log(f"✓ {os.path.basename(media_file)} → {datetime_str} ({timezone_label})", "success")
-                        updated_photos += 1
-                    else:
-                        # Log stderr if available, otherwise just note the error code
-                        error_detail = result.stderr.strip() if result.stderr else f"ExifTool exited with code {result.returncode}"
-                        log(f"✗ Error processing {os.path.basename(media_file)}: {error_detail}", "error")
-                        error_photos += 1
-                except FileNotFoundError:
-                     log(f"✗ Error: ExifTool (or Perl) not found at the specified path: {perl_cmd[0]}", "error")
-                     # Stop processing further files if ExifTool isn't found
-                     return 
-                except Exception as sub_e:
-                     log(f"✗ Subprocess error running ExifTool for {os.path.basename(media_file)}: {sub_e}", "error")
-                     error_photos +=1
-
-            except json.JSONDecodeError as json_e:
-                log(f"✗ JSON decode error in: {os.path.basename(json_path)} | {json_e}", "error")
-                error_photos += 1
-            except FileNotFoundError:
-                 # Catch if JSON file disappears between listing and processing
-                 log(f"✗ File not found (moved?): {os.path.basename(json_path)}", "error")
-                 error_photos += 1
-            except Exception as e:
-                log(f"✗ Unexpected file error: {os.path.basename(json_path)} | {e}", "error")
-                error_photos += 1
+        finish_scan_cache(cache)
+        if profiler is not None:
+            profiler.checkpoint()
+
+        if not manifest.sidecar_count():
+            log("❌ No JSON metadata files found!", "error")
+            if journal is not None:
+                journal.close()
+            return
         
         log("\n" + "=" * 60)
         log("🔄 Separating files without metadata...", "warning")
-        move_files_without_matching_json(source_folder)
+        with stage_timer('phase.separate'):
+            move_files_without_matching_json(source_folder, manifest)
         
         log("\n" + "=" * 60)
         log("📋 Organizing JSON files...", "warning")
-        organize_json_files(source_folder)
+        with stage_timer('phase.organize'):
+            organize_json_files(source_folder, manifest, journal)
+        if profiler is not None:
+            profiler.checkpoint()
+        if journal is not None:
+            if error_photos:
+                journal.close()
+                log("The job journal is kept; run again with --resume to retry only the failed files", "info")
+            else:
+                journal.discard()
         
         # --- THIS LINE WAS FIXED ---
         log("\n" + "=" * 60)
-        log("🎉 Metadata Application Complete!", "success")
+        log("🎉 Metadata Application Complete!", "success", LOG_QUIET)
         log("=" * 60)
-        log(f"Total photos processed:  {total_photos}")
-        log(f"Successfully updated:    {updated_photos}", "success")
-        log(f"Errors encountered:      {error_photos}", "error" if error_photos > 0 else None)
-        log("\n✅ Processing finished.", "success")
+        log(f"Total photos processed:  {total_photos}", level=LOG_QUIET)
+        log(f"Successfully updated:    {updated_photos}", "success", LOG_QUIET)
+        log(f"Errors encountered:      {error_photos}", "error" if error_photos > 0 else None, LOG_QUIET)
+        log_stage_timings()
+        log("\n✅ Processing finished.", "success", LOG_QUIET)
         
     except Exception as e:
         log(f"\n❌ Fatal error during processing: {e}", "error")
     finally:
+        if profiler is not None:
+            profiler.stop()
         # Final log to signal completion regardless of success/failure,
         # helps Electron know the script finished.
-        log("Script execution finished.", "info")
+        log("Script execution finished.", "info", LOG_QUIET)
 
 
 # --- Main execution ---
-if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        log("Usage: python batch_fixer_cli.py <source_folder> <timezone_mode> <exiftool_path>", "error")
+class LoggingArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser that reports usage errors through log() instead of stderr."""
+
+    def error(self, message):
+        log(f"Error: {message}", "error")
+        log(self.format_usage().strip(), "error")
         sys.exit(1)
 
-    source_folder_arg = sys.argv[1]
-    timezone_mode_arg = sys.argv[2]
-    exiftool_path_arg = sys.argv[3] # Path to the bundled exiftool (script or exe)
+
+def build_arg_parser():
+    parser = LoggingArgumentParser(
+        prog="batch_fixer_cli.py",
+        description="Apply Takeout JSON sidecar metadata to media files."
+    )
+    parser.add_argument("source_folder")
+    parser.add_argument("timezone_mode")
+    parser.add_argument("exiftool_path", help="Path to the bundled exiftool (script or exe)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of parallel ExifTool processes (default: CPU count)")
+    parser.add_argument("--engine", choices=["stay-open", "argfile", "native", "exiftool-tree"],
+                        default="stay-open",
+                        help="stay-open: one command per file on persistent ExifTool workers; "
+                             "argfile: chunks of files per ExifTool run via -@ argfiles; "
+                             "native: patch existing JPEG EXIF and MP4/MOV header dates in place, "
+                             "ExifTool for the rest; "
+                             "exiftool-tree: one ExifTool run per sidecar suffix, over the files "
+                             "named after their media file")
+    parser.add_argument("--chunk-size", type=int, default=500,
+                        help="Files per argfile with --engine argfile (default: 500)")
+    parser.add_argument("--tz", metavar="IANA_NAME",
+                        help="Convert to this IANA timezone (e.g. Europe/Berlin) instead of "
+                             "the timezone mode, and write OffsetTimeOriginal; "
+                             "'auto-gps' picks each photo's zone from its GPS position")
+    parser.add_argument("--tz-default", metavar="IANA_NAME",
+                        help="Zone for photos without GPS with --tz auto-gps "
+                             "(default: the timezone mode's zone)")
+    parser.add_argument("--tz-data", metavar="PATH",
+                        help=f"Timezone boundary GeoJSON for --tz auto-gps (default: the bundled, "
+                             f"simplified {TIMEZONE_DATA_FILENAME} next to this script)")
+    parser.add_argument("--verbosity", choices=list(LOG_LEVELS), default="normal",
+                        help="quiet: errors, warnings and summaries; normal: plus progress messages, "
+                             "with per-file results summarized about once a second; "
+                             "verbose: one line per file")
+    parser.add_argument("--json-workers", type=int, default=SIDECAR_READ_WORKERS,
+                        help=f"Concurrent sidecar reads (default: {SIDECAR_READ_WORKERS})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip files the previous run's journal already records as written")
+    parser.add_argument("--only-changed", action="store_true",
+                        help="Read current metadata first and only write files that differ")
+    parser.add_argument("--scan-cache", action="store_true",
+                        help="Reuse directory listings from earlier runs for folders whose mtime is unchanged")
+    parser.add_argument("--profile", nargs="?", const="", metavar="PATH",
+                        help="Also write a cProfile/pstats file (default: "
+                             f"{RunProfiler.FILENAME} in the source folder) and report "
+                             "tracemalloc's peak memory and a snapshot of it")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    _log_writer.verbosity = LOG_LEVELS[args.verbosity]
+
+    source_folder_arg = args.source_folder
+    timezone_mode_arg = args.timezone_mode
+    exiftool_path_arg = args.exiftool_path # Path to the bundled exiftool (script or exe)
 
     if not os.path.isdir(source_folder_arg):
          log(f"Error: Source folder not found or is not a directory: {source_folder_arg}", "error")
@@ -437,6 +2736,38 @@ if __name__ == "__main__":
          log(f"Error: Invalid timezone mode '{timezone_mode_arg}'. Use 'pacific' or 'utc'.", "error")
          sys.exit(1)
 
+    zone_args = [args.tz_default]
+    if args.tz != AUTO_GPS_TZ:
+        zone_args.append(args.tz)
+    if args.tz is not None or args.tz_default is not None:
+        try:
+            import_zoneinfo()
+        except RuntimeError as e:
+            log(f"Error: {e} (running {platform.python_version()}).", "error")
+            sys.exit(1)
+    for zone_arg in zone_args:
+        if zone_arg is None:
+            continue
+        if not is_known_zone(zone_arg):
+            log(f"Error: Unknown timezone '{zone_arg}'. Use an IANA name like 'Europe/Berlin'.", "error")
+            sys.exit(1)
+
+    if args.workers < 1:
+         log(f"Error: --workers must be at least 1 (got {args.workers}).", "error")
+         sys.exit(1)
+
+    if args.chunk_size < 1:
+         log(f"Error: --chunk-size must be at least 1 (got {args.chunk_size}).", "error")
+         sys.exit(1)
+
+    if args.json_workers < 1:
+         log(f"Error: --json-workers must be at least 1 (got {args.json_workers}).", "error")
+         sys.exit(1)
+
+    profile_path_arg = args.profile
+    if profile_path_arg == "":
+        profile_path_arg = os.path.join(source_folder_arg, RunProfiler.FILENAME)
+
     # Basic check if exiftool path exists (more robust check happens in process_photos)
     if not os.path.exists(exiftool_path_arg):
          log(f"Error: ExifTool path not found: {exiftool_path_arg}", "error")
@@ -444,7 +2775,12 @@ if __name__ == "__main__":
 
 
     try:
-        process_photos(source_folder_arg, timezone_mode_arg, exiftool_path_arg)
+        process_photos(source_folder_arg, timezone_mode_arg, exiftool_path_arg,
+                       workers=args.workers, engine=args.engine, chunk_size=args.chunk_size,
+                       resume=args.resume, only_changed=args.only_changed,
+                       scan_cache=args.scan_cache, json_workers=args.json_workers,
+                       tz_name=args.tz, tz_default=args.tz_default, tz_data=args.tz_data,
+                       profile_path=profile_path_arg)
         
     except Exception as e:
         log(f"A critical error occurred: {e}", "error")
@@ -0,0 +1,82 @@
+# Filename classification for Google Takeout trees: which names are JSON
+# sidecars, which are media files, and what is left once the suffix is cut
+# off. Every walk and match path in batch_fixer_cli.py goes through here.
+# The suffix tables are built once at import. str.endswith with a tuple
+# rejects non-matching names (most of a walk) in C; for the rest, one set
+# lookup per distinct suffix length names the suffix that matched.
+
+# Suffixes Takeout appends to the media filename, as it writes them
+SIDECAR_PATTERNS = [
+    '.supplemental-metadata.json', '.supplemental-metada.json',
+    '.supplemental-met.json', '.supplemental-m.json',
+    '.supplemental.json', '.supplement.json'
+]
+
+# Media extensions, in the order exact-name matches prefer them
+MEDIA_EXTENSIONS = [
+    '.jpg', '.jpeg', '.heic', '.png', '.gif', '.webp', '.mp4', '.m4v',
+    '.mov', '.MP.jpg', '.HEIC', '.JPG', '.PNG', '.MP4', '.MOV'
+]
+
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+QUICKTIME_EXTENSIONS = ('.mp4', '.m4v', '.mov')
+
+
+class SuffixTable:
+    """A fixed set of filename suffixes, precompiled for matching.
+
+    `suffixes` is the de-duplicated tuple (longest first) to pass to
+    str.endswith. With casefold, names are compared lowercased and the
+    suffixes are stored lowercased.
+    """
+
+    __slots__ = ('suffixes', 'casefold', '_lengths', '_known')
+
+    def __init__(self, suffixes, casefold=False):
+        if casefold:
+            suffixes = [suffix.lower() for suffix in suffixes]
+        unique = list(dict.fromkeys(suffixes))
+        self.suffixes = tuple(sorted(unique, key=len, reverse=True))
+        self.casefold = casefold
+        self._lengths = sorted({len(suffix) for suffix in unique}, reverse=True)
+        self._known = frozenset(unique)
+
+    def split(self, name):
+        """(base, suffix) for the longest suffix name ends with, or None.
+
+        The base keeps the name's own case; the suffix is the table's form.
+        """
+        key = name.lower() if self.casefold else name
+        if not key.endswith(self.suffixes):
+            return None
+        for length in self._lengths:
+            suffix = key[-length:]
+            if suffix in self._known:
+                return name[:-length], suffix
+        return None
+
+
+SIDECARS = SuffixTable(SIDECAR_PATTERNS)
+MEDIA = SuffixTable(MEDIA_EXTENSIONS, casefold=True)
+
+# Case-folded media extensions, de-duplicated, in MEDIA_EXTENSIONS preference order
+MEDIA_EXTENSIONS_PREFERRED = tuple(dict.fromkeys(ext.lower() for ext in MEDIA_EXTENSIONS))
+
+
+def is_sidecar(filename):
+    return filename.endswith(SIDECARS.suffixes)
+
+
+def is_media_lower(lower_filename):
+    """Media test for a name the caller has already lowercased."""
+    return lower_filename.endswith(MEDIA.suffixes)
+
+
+def sidecar_base(filename):
+    """'x.jpg.supplemental-metadata.json' -> 'x.jpg'; other names are returned unchanged."""
+    split = SIDECARS.split(filename)
+    return filename if split is None else split[0]
+
+
+def is_quicktime(filename):
+    return filename.lower().endswith(QUICKTIME_EXTENSIONS)
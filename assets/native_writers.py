@@ -0,0 +1,319 @@
+# Native in-place metadata patchers used by batch_fixer_cli.py.
+# These only ever overwrite existing fixed-size fields through a memory map;
+# anything that would need the file layout to change is left to ExifTool.
+# Every patcher returns True when it patched the file and False when the
+# caller should fall back to ExifTool (in which case nothing was written).
+
+import mmap
+import os
+import struct
+
+# --- JPEG / EXIF ---
+
+EXIF_DATETIME_LENGTH = 20  # 'YYYY:MM:DD HH:MM:SS' plus NUL
+EXIF_OFFSET_LENGTH = 7     # '+HH:MM' plus NUL
+
+# Tag IDs (IFD the tag lives in, tag number)
+TAG_MODIFY_DATE = ('IFD0', 0x0132)
+TAG_DATETIME_ORIGINAL = ('ExifIFD', 0x9003)
+TAG_CREATE_DATE = ('ExifIFD', 0x9004)
+TAG_OFFSET_TIME_ORIGINAL = ('ExifIFD', 0x9011)
+# name -> (IFD, tag number, ASCII count including the NUL)
+EXIF_DATE_TAGS = {
+    'ModifyDate': TAG_MODIFY_DATE + (EXIF_DATETIME_LENGTH,),
+    'DateTimeOriginal': TAG_DATETIME_ORIGINAL + (EXIF_DATETIME_LENGTH,),
+    'CreateDate': TAG_CREATE_DATE + (EXIF_DATETIME_LENGTH,),
+    'OffsetTimeOriginal': TAG_OFFSET_TIME_ORIGINAL + (EXIF_OFFSET_LENGTH,),
+}
+
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+GPS_LATITUDE_REF = 0x0001
+GPS_LATITUDE = 0x0002
+GPS_LONGITUDE_REF = 0x0003
+GPS_LONGITUDE = 0x0004
+
+TYPE_ASCII = 2
+TYPE_RATIONAL = 5
+
+
+class _TiffView:
+    """Read-only helper over the TIFF structure inside an EXIF APP1 segment."""
+
+    def __init__(self, buf, start, end):
+        self.buf = buf
+        self.start = start
+        self.end = end
+        order = bytes(buf[start:start + 2])
+        if order == b'II':
+            self.endian = '<'
+        elif order == b'MM':
+            self.endian = '>'
+        else:
+            raise ValueError("bad TIFF byte order")
+        if self.unpack('H', 2) != 42:
+            raise ValueError("bad TIFF magic")
+
+    def unpack(self, fmt, offset):
+        size = struct.calcsize(fmt)
+        pos = self.start + offset
+        if offset < 0 or pos + size > self.end:
+            raise ValueError("TIFF offset out of range")
+        return struct.unpack_from(self.endian + fmt, self.buf, pos)[0]
+
+    def entries(self, ifd_offset):
+        """Maps tag -> (type, count, absolute offset of the entry's value field)."""
+        count = self.unpack('H', ifd_offset)
+        entries = {}
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            tag = self.unpack('H', entry)
+            entries[tag] = (self.unpack('H', entry + 2), self.unpack('L', entry + 4), entry + 8)
+        return entries
+
+    def value_position(self, entry, size):
+        """Absolute buffer position of an entry's value (inline when it fits in 4 bytes)."""
+        _, _, value_field = entry
+        if size <= 4:
+            return self.start + value_field
+        offset = self.unpack('L', value_field)
+        if offset + size > self.end - self.start:
+            raise ValueError("TIFF value out of range")
+        return self.start + offset
+
+
+def _find_exif_tiff(buf):
+    """Returns (start, end) of the TIFF block in a JPEG's EXIF APP1 segment, or None."""
+    if buf[:2] != b'\xff\xd8':
+        return None
+    pos = 2
+    size = len(buf)
+    while pos + 4 <= size:
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker in (0xDA, 0xD9):  # start of scan / end of image: no more metadata
+            return None
+        length = struct.unpack_from('>H', buf, pos + 2)[0]
+        segment_end = pos + 2 + length
+        if length < 2 or segment_end > size:
+            return None
+        if marker == 0xE1 and buf[pos + 4:pos + 10] == b'Exif\x00\x00':
+            return pos + 10, segment_end
+        pos = segment_end
+    return None
+
+
+def _gps_rationals(value):
+    """Degrees as three (numerator, denominator) pairs, seconds to 1/10000."""
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 10000)
+    if seconds >= 60 * 10000:
+        seconds -= 60 * 10000
+        minutes += 1
+    if minutes >= 60:
+        minutes -= 60
+        degrees += 1
+    return [(degrees, 1), (minutes, 1), (seconds, 10000)]
+
+
+def patch_jpeg_exif(path, datetimes, gps=None):
+    """Overwrites EXIF date/time (and optionally GPS) values of a JPEG in place.
+
+    datetimes maps tag names from EXIF_DATE_TAGS to 'YYYY:MM:DD HH:MM:SS'
+    strings (or '+HH:MM' for OffsetTimeOriginal); gps is a (latitude,
+    longitude) pair or None. Every requested field must already exist with
+    the expected type and size.
+    """
+    for name, value in datetimes.items():
+        if len(value) != EXIF_DATE_TAGS[name][2] - 1:
+            return False
+
+    with open(path, 'r+b') as f:
+        if os.fstat(f.fileno()).st_size < 4:
+            return False
+        with mmap.mmap(f.fileno(), 0) as buf:
+            try:
+                writes = _plan_jpeg_writes(buf, datetimes, gps)
+            except (ValueError, struct.error):
+                return False
+            if writes is None:
+                return False
+            for position, data in writes:
+                buf[position:position + len(data)] = data
+            buf.flush()
+    return True
+
+
+def _plan_jpeg_writes(buf, datetimes, gps):
+    """Resolves every field first so a missing one leaves the file untouched."""
+    tiff_range = _find_exif_tiff(buf)
+    if tiff_range is None:
+        return None
+    tiff = _TiffView(buf, *tiff_range)
+
+    ifds = {'IFD0': tiff.entries(tiff.unpack('L', 4))}
+    pointer = ifds['IFD0'].get(EXIF_IFD_POINTER)
+    if pointer is not None:
+        ifds['ExifIFD'] = tiff.entries(tiff.unpack('L', pointer[2]))
+    pointer = ifds['IFD0'].get(GPS_IFD_POINTER)
+    if pointer is not None:
+        ifds['GPS'] = tiff.entries(tiff.unpack('L', pointer[2]))
+
+    writes = []
+    for name, value in datetimes.items():
+        ifd, tag, length = EXIF_DATE_TAGS[name]
+        entry = ifds.get(ifd, {}).get(tag)
+        if entry is None or entry[0] != TYPE_ASCII or entry[1] != length:
+            return None
+        position = tiff.value_position(entry, length)
+        writes.append((position, value.encode('ascii') + b'\x00'))
+
+    if gps is not None:
+        gps_entries = ifds.get('GPS')
+        if gps_entries is None:
+            return None
+        latitude, longitude = gps
+        fields = [
+            (GPS_LATITUDE_REF, b'N\x00' if latitude >= 0 else b'S\x00'),
+            (GPS_LONGITUDE_REF, b'E\x00' if longitude >= 0 else b'W\x00'),
+        ]
+        for tag, ref in fields:
+            entry = gps_entries.get(tag)
+            if entry is None or entry[0] != TYPE_ASCII or entry[1] != 2:
+                return None
+            writes.append((tiff.value_position(entry, 2), ref))
+        for tag, value in ((GPS_LATITUDE, latitude), (GPS_LONGITUDE, longitude)):
+            entry = gps_entries.get(tag)
+            if entry is None or entry[0] != TYPE_RATIONAL or entry[1] != 3:
+                return None
+            data = b''.join(struct.pack(tiff.endian + 'LL', num, den)
+                            for num, den in _gps_rationals(value))
+            writes.append((tiff.value_position(entry, 24), data))
+    return writes
+
+
+# --- QuickTime / ISO-BMFF ---
+
+QUICKTIME_EPOCH_OFFSET = 2082844800  # seconds from 1904-01-01 to 1970-01-01
+MAX_MOOV_SIZE = 256 * 1024 * 1024    # sanity limit for the in-memory moov copy
+
+# Boxes whose children we descend into on the way to the header boxes
+QUICKTIME_CONTAINERS = {b'moov', b'trak', b'mdia'}
+QUICKTIME_DATE_BOXES = {b'mvhd', b'tkhd', b'mdhd'}
+
+
+def _read_box_header(data, pos, end):
+    """Returns (box type, payload start, box end) for the box at pos, or None."""
+    if pos + 8 > end:
+        return None
+    size, box_type = struct.unpack_from('>I4s', data, pos)
+    header = 8
+    if size == 1:
+        if pos + 16 > end:
+            return None
+        size = struct.unpack_from('>Q', data, pos + 8)[0]
+        header = 16
+    elif size == 0:
+        size = end - pos
+    if size < header or pos + size > end:
+        return None
+    return box_type, pos + header, pos + size
+
+
+def _find_moov(f, file_size):
+    """Walks the top-level boxes by seeking; returns (moov offset, moov size) or None."""
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack_from('>I4s', header, 0)
+        if size == 1:
+            if len(header) < 16:
+                return None
+            size = struct.unpack_from('>Q', header, 8)[0]
+        elif size == 0:
+            size = file_size - pos
+        if size < 8 or pos + size > file_size:
+            return None
+        if box_type == b'moov':
+            return pos, size
+        pos += size
+    return None
+
+
+def _plan_quicktime_writes(moov, qt_time):
+    """Collects (offset in moov, bytes) for every creation time in mvhd/tkhd/mdhd.
+
+    moov holds the whole moov box including its header, so the walk starts
+    at the top level and descends through QUICKTIME_CONTAINERS.
+    """
+    writes = []
+    found = set()
+    pending = [(0, len(moov))]
+    while pending:
+        pos, end = pending.pop()
+        while pos < end:
+            parsed = _read_box_header(moov, pos, end)
+            if parsed is None:
+                return None
+            box_type, payload, box_end = parsed
+            if box_type in QUICKTIME_CONTAINERS:
+                pending.append((payload, box_end))
+            elif box_type in QUICKTIME_DATE_BOXES:
+                if payload + 4 > box_end:
+                    return None
+                version = moov[payload]
+                if version == 0:
+                    if qt_time > 0xFFFFFFFF or payload + 8 > box_end:
+                        return None
+                    writes.append((payload + 4, struct.pack('>I', qt_time)))
+                elif version == 1:
+                    if payload + 12 > box_end:
+                        return None
+                    writes.append((payload + 4, struct.pack('>Q', qt_time)))
+                else:
+                    return None
+                found.add(box_type)
+            pos = box_end
+    if b'mvhd' not in found:
+        return None
+    return writes
+
+
+def patch_quicktime_dates(path, timestamp):
+    """Overwrites the creation time in every mvhd, tkhd and mdhd box in place.
+
+    timestamp is seconds since 1970 for the value to store; like ExifTool
+    without the QuickTimeUTC option, the caller's wall-clock time is stored
+    as-is. Only the moov box is read; the media data is never touched.
+    """
+    qt_time = int(timestamp) + QUICKTIME_EPOCH_OFFSET
+    if qt_time < 0:
+        return False
+
+    with open(path, 'r+b') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        located = _find_moov(f, file_size)
+        if located is None:
+            return False
+        moov_offset, moov_size = located
+        if moov_size > MAX_MOOV_SIZE:
+            return False
+        f.seek(moov_offset)
+        moov = f.read(moov_size)
+        writes = _plan_quicktime_writes(moov, qt_time)
+        if writes is None:
+            return False
+        for offset, data in writes:
+            f.seek(moov_offset + offset)
+            f.write(data)
+    return True
@@ -5,6 +5,7 @@ import json
 import subprocess
 import sys
 import platform
+import time
 from datetime import datetime
 
 # --- Logging Function ---
@@ -41,6 +42,15 @@ def validate_datetime(date_str, time_str):
         log_message(f"Invalid date/time format: {e}. Use YYYY-MM-DD and HH:MM:SS", "error")
         return False
 
+# --- Helper: Set File Times ---
+def set_file_times(file_path, exiftool_datetime):
+    """Sets access/modify time from a local 'YYYY:MM:DD HH:MM:SS' string (what -FileModifyDate did)."""
+    try:
+        ns = int(time.mktime(time.strptime(exiftool_datetime, '%Y:%m:%d %H:%M:%S'))) * 1_000_000_000
+        os.utime(file_path, ns=(ns, ns))
+    except (OSError, ValueError, OverflowError) as e:
+        log_message(f"⚠️ Could not set file modification date: {e}", "warning")
+
 # --- Core Logic ---
 def apply_metadata(file_path, date_str, time_str, exiftool_cmd):
     """Applies the new date and time to the selected file."""
@@ -64,8 +74,10 @@ def apply_metadata(file_path, date_str, time_str, exiftool_cmd):
         
         # Apply to all relevant tags
         cmd_args.append(f'-AllDates={exiftool_datetime}')
-        cmd_args.append(f'-FileCreateDate={exiftool_datetime}')
-        cmd_args.append(f'-FileModifyDate={exiftool_datetime}')
+        # FileModifyDate is set with os.utime after the write (see set_file_times);
+        # ExifTool can only set the creation date on Windows and macOS
+        if platform.system() in ('Windows', 'Darwin'):
+            cmd_args.append(f'-FileCreateDate={exiftool_datetime}')
         
         # Specific tags for videos that AllDates might miss
         cmd_args.append(f'-TrackCreateDate={exiftool_datetime}')
@@ -80,6 +92,7 @@ def apply_metadata(file_path, date_str, time_str, exiftool_cmd):
         result = subprocess.run(full_cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
         
         if result.returncode == 0:
+            set_file_times(file_path, exiftool_datetime)
             log_message("=" * 60)
             log_message(f"✓ All Dates Set To: {exiftool_datetime}", "success")
             # The final "success" message is sent by the renderer.js
@@ -0,0 +1,187 @@
+# Offline timezone lookup used by batch_fixer_cli.py's --tz auto-gps mode.
+# Zone boundaries come from timezones.geojson next to this file: the
+# timezone-boundary-builder "with oceans" release (ODbL 1.0), simplified to
+# about 1 km by tools/build_timezone_data.py. A full-resolution release
+# (combined-with-oceans.json) can be passed with --tz-data instead.
+
+import json
+import math
+
+TIMEZONE_DATA_FILENAME = 'timezones.geojson'
+
+GRID_DEGREES = 1.0      # bucket size of the spatial index
+CACHE_DEGREES = 0.001   # resolved points are cached per cell of this size (~100 m)
+
+
+def _point_in_rings(x, y, rings):
+    """Even-odd ray casting over all rings at once, so holes need no special case."""
+    inside = False
+    for ring in rings:
+        x1, y1 = ring[-1]
+        for x2, y2 in ring:
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+                inside = not inside
+            x1, y1 = x2, y2
+    return inside
+
+
+def _split_ring(ring, axis, value):
+    """Sutherland-Hodgman clip of a ring to both sides of the line axis == value.
+
+    Returns (part with axis <= value, part with axis >= value). Where the ring
+    crosses the line, each part runs along it; those edges bound the clipped
+    area, so even-odd tests of points strictly on that side stay correct.
+    """
+    other = 1 - axis
+    low, high = [], []
+    previous = ring[-1]
+    previous_side = previous[axis] - value
+    for point in ring:
+        side = point[axis] - value
+        if (side > 0) != (previous_side > 0) and side != 0 and previous_side != 0:
+            t = previous_side / (previous_side - side)
+            crossing = previous[other] + t * (point[other] - previous[other])
+            crossing = (value, crossing) if axis == 0 else (crossing, value)
+            low.append(crossing)
+            high.append(crossing)
+        if side <= 0:
+            low.append(point)
+        if side >= 0:
+            high.append(point)
+        previous, previous_side = point, side
+    return low, high
+
+
+def _split_rings(rings, axis, value):
+    """Splits every ring at the line; rings wholly on one side are kept as they are."""
+    low_rings, high_rings = [], []
+    for ring in rings:
+        coordinates = [point[axis] for point in ring]
+        if max(coordinates) <= value:
+            low_rings.append(ring)
+        elif min(coordinates) >= value:
+            high_rings.append(ring)
+        else:
+            low, high = _split_ring(ring, axis, value)
+            if len(low) >= 3:
+                low_rings.append(low)
+            if len(high) >= 3:
+                high_rings.append(high)
+    return low_rings, high_rings
+
+
+def _split_into_cells(rings, cell_x0, cell_y0, cell_x1, cell_y1, cells):
+    """Clips rings to each grid cell of the inclusive cell range, halving the
+    range along its longer side so each vertex is clipped O(log cells) times.
+    Fills cells with (cell x, cell y) -> clipped rings for every cell they reach."""
+    if not rings:
+        return
+    if cell_x0 == cell_x1 and cell_y0 == cell_y1:
+        cells[(cell_x0, cell_y0)] = rings
+        return
+    if cell_x1 - cell_x0 >= cell_y1 - cell_y0:
+        middle = (cell_x0 + cell_x1 + 1) // 2
+        low, high = _split_rings(rings, 0, middle * GRID_DEGREES)
+        _split_into_cells(low, cell_x0, cell_y0, middle - 1, cell_y1, cells)
+        _split_into_cells(high, middle, cell_y0, cell_x1, cell_y1, cells)
+    else:
+        middle = (cell_y0 + cell_y1 + 1) // 2
+        low, high = _split_rings(rings, 1, middle * GRID_DEGREES)
+        _split_into_cells(low, cell_x0, cell_y0, cell_x1, middle - 1, cells)
+        _split_into_cells(high, cell_x0, middle, cell_x1, cell_y1, cells)
+
+
+def _covers(rings, min_x, min_y, max_x, max_y):
+    """True if rings clipped to the box fill the whole box."""
+    # With every edge on the box's border, the box is all inside or all outside
+    for ring in rings:
+        x1, y1 = ring[-1]
+        for x2, y2 in ring:
+            if not ((x1 == x2 and x1 in (min_x, max_x)) or (y1 == y2 and y1 in (min_y, max_y))):
+                return False
+            x1, y1 = x2, y2
+    return _point_in_rings((min_x + max_x) / 2, (min_y + max_y) / 2, rings)
+
+
+class TimezoneIndex:
+    """Zone polygons clipped to a grid, with point-in-polygon lookups.
+
+    Each polygon is clipped to every GRID_DEGREES cell it reaches, so a
+    lookup only tests the few edges inside the point's own cell, however
+    long the zone's coastline. A cell that lies wholly inside one polygon is
+    answered without any polygon test, and every resolved point is cached
+    per CACHE_DEGREES cell, so clustered photos cost a dictionary lookup.
+    """
+
+    def __init__(self):
+        self.buckets = {}  # (cell x, cell y) -> [(tzid, rings clipped to the cell), ...]
+        self.covering = {}  # (cell x, cell y) -> tzid of a polygon covering the whole cell, or None
+        self.cache = {}
+        self.zone_names = set()
+
+    @classmethod
+    def load(cls, path):
+        """Builds the index from a GeoJSON FeatureCollection with a 'tzid' property."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        for feature in data.get('features', []):
+            tzid = (feature.get('properties') or {}).get('tzid')
+            geometry = feature.get('geometry') or {}
+            if not tzid:
+                continue
+            if geometry.get('type') == 'Polygon':
+                polygons = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                polygons = geometry['coordinates']
+            else:
+                continue
+            for rings in polygons:
+                if rings and len(rings[0]) >= 3:
+                    index.add_polygon(tzid, [[(point[0], point[1]) for point in ring] for ring in rings])
+        return index
+
+    def add_polygon(self, tzid, rings):
+        """rings: outer ring then holes, each a list of (longitude, latitude)."""
+        rings = [ring for ring in rings if len(ring) >= 3]
+        if not rings:
+            return
+        self.zone_names.add(tzid)
+        xs = [x for x, _ in rings[0]]
+        ys = [y for _, y in rings[0]]
+        cells = {}
+        _split_into_cells(rings, math.floor(min(xs) / GRID_DEGREES), math.floor(min(ys) / GRID_DEGREES),
+                          math.floor(max(xs) / GRID_DEGREES), math.floor(max(ys) / GRID_DEGREES), cells)
+        for cell, cell_rings in cells.items():
+            self.buckets.setdefault(cell, []).append((tzid, cell_rings))
+        self.covering.clear()
+        self.cache.clear()
+
+    def lookup(self, latitude, longitude):
+        """Returns the tzid containing the point, or None outside every polygon.
+
+        Where polygons overlap, the one added first wins. A point exactly on
+        a polygon edge may resolve to either side (or to None at the edge of
+        the data), as clipping rounds the crossing points it adds.
+        """
+        # GeoJSON splits zones at the antimeridian; 180 and -180 are the same line
+        if not -180.0 <= longitude < 180.0:
+            longitude = (longitude + 180.0) % 360.0 - 180.0
+        cache_key = (math.floor(longitude / CACHE_DEGREES), math.floor(latitude / CACHE_DEGREES))
+        if cache_key in self.cache:
+            return self.cache[cache_key]
+
+        cell = (math.floor(longitude / GRID_DEGREES), math.floor(latitude / GRID_DEGREES))
+        candidates = self.buckets.get(cell, [])
+        if cell not in self.covering:
+            box = (cell[0] * GRID_DEGREES, cell[1] * GRID_DEGREES,
+                   (cell[0] + 1) * GRID_DEGREES, (cell[1] + 1) * GRID_DEGREES)
+            # Only the first polygon may answer for the whole cell: where zones
+            # overlap, an earlier polygon wins, as in the point tests below
+            first = candidates[0] if candidates else None
+            self.covering[cell] = first[0] if first and _covers(first[1], *box) else None
+        tzid = self.covering[cell]
+        if tzid is None:
+            tzid = next((tzid for tzid, rings in candidates if _point_in_rings(longitude, latitude, rings)), None)
+        self.cache[cache_key] = tzid
+        return tzid
@@ -0,0 +1,35 @@
+# Offline benchmarks for assets/batch_fixer_cli.py.
+# Kept outside assets/ because everything under assets/ ships with the app.
+#
+#   python -m benchmarks.takeout_tree /tmp/takeout --files 10k
+#   python -m benchmarks.run_benchmark --files 10k --output report.json
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(REPO_DIR, 'assets')
+BUNDLED_EXIFTOOL = os.path.join(ASSETS_DIR, 'exiftool')
+FAKE_EXIFTOOL = os.path.join(REPO_DIR, 'benchmarks', 'fake_exiftool.py')
+
+
+def import_batch_fixer():
+    """Imports assets/batch_fixer_cli.py the way the app runs it (assets/ on sys.path)."""
+    if ASSETS_DIR not in sys.path:
+        sys.path.insert(0, ASSETS_DIR)
+    import batch_fixer_cli
+    return batch_fixer_cli
+
+
+def parse_count(value):
+    """'1k', '250K', '1m' or '5000' -> int."""
+    text = str(value).strip().lower()
+    multiplier = 1
+    if text.endswith('k'):
+        multiplier, text = 1000, text[:-1]
+    elif text.endswith('m'):
+        multiplier, text = 1000000, text[:-1]
+    count = int(float(text) * multiplier)
+    if count < 1:
+        raise ValueError(f"count must be at least 1: {value}")
+    return count
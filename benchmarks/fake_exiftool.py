@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# A stand-in for ExifTool that costs no Perl start-up or metadata I/O, for
+# benchmarking and stress-testing batch_fixer_cli.py's own scheduling, pooling
+# and logging. Pass this file as the exiftool path (it has no lib/ folder
+# next to it, so batch_fixer_cli.py runs it directly):
+#
+#   python assets/batch_fixer_cli.py /tmp/takeout pacific benchmarks/fake_exiftool.py
+#   python -m benchmarks.run_benchmark --exiftool fake
+#
+# It understands the parts of the ExifTool CLI the batch fixer uses: single
+# commands, -@ argfiles with -execute[N], -stay_open True -@ -, -echo[1-4]
+# with ${status}, -q, -json reads, -efile[N][!] lists and recursive
+# -tagsFromFile runs over folders (-r, -ext, -i). Tag values are accepted but
+# nothing is parsed or validated.
+#
+# Behaviour is tuned through environment variables:
+#   FAKE_EXIFTOOL_STARTUP       seconds to sleep when the process starts (0)
+#   FAKE_EXIFTOOL_LATENCY       seconds per processed file (0)
+#   FAKE_EXIFTOOL_JITTER        extra random seconds per file, uniform in [0, x) (0)
+#   FAKE_EXIFTOOL_FAILURE_RATE  share of files that fail with an Error line (0)
+#   FAKE_EXIFTOOL_WARNING_RATE  share of files that also print a Warning line (0)
+#   FAKE_EXIFTOOL_CRASH_RATE    chance per command that the process dies mid-command (0)
+#   FAKE_EXIFTOOL_TOUCH         1 to rewrite each written file like -overwrite_original (0)
+#   FAKE_EXIFTOOL_READ_TAGS     JSON object of tag values returned by -json reads ({})
+#   FAKE_EXIFTOOL_SEED          seed for the rates above (0)
+# Which files fail or warn depends only on the seed and the file path, so
+# every run (and every worker) picks the same ones.
+
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+FAKE_VERSION = '13.00'
+
+# Options followed by a value argument (compared lowercased, like ExifTool)
+VALUE_OPTIONS = {
+    '-@', '-api', '-c', '-charset', '-config', '-d', '-echo', '-echo1', '-echo2', '-echo3',
+    '-echo4', '-ext', '-extension', '-fileorder', '-i', '-if', '-lang', '-o', '-p', '-sep',
+    '-srcfile', '-stay_open', '-tagsfromfile', '-userparam', '-w', '-x',
+}
+
+EFILE_ERRORS = 1
+EFILE_UNCHANGED = 2
+EFILE_UPDATED = 8
+
+
+def _env_float(name, default=0.0):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class Config:
+    def __init__(self):
+        self.startup = _env_float('FAKE_EXIFTOOL_STARTUP')
+        self.latency = _env_float('FAKE_EXIFTOOL_LATENCY')
+        self.jitter = _env_float('FAKE_EXIFTOOL_JITTER')
+        self.failure_rate = _env_float('FAKE_EXIFTOOL_FAILURE_RATE')
+        self.warning_rate = _env_float('FAKE_EXIFTOOL_WARNING_RATE')
+        self.crash_rate = _env_float('FAKE_EXIFTOOL_CRASH_RATE')
+        self.touch = os.environ.get('FAKE_EXIFTOOL_TOUCH', '0') not in ('', '0')
+        self.seed = os.environ.get('FAKE_EXIFTOOL_SEED', '0')
+        try:
+            self.read_tags = json.loads(os.environ.get('FAKE_EXIFTOOL_READ_TAGS') or '{}')
+        except json.JSONDecodeError:
+            self.read_tags = {}
+        self.rng = random.Random(f"{self.seed}:{os.getpid()}")
+
+    def roll(self, kind, path):
+        """Deterministic [0, 1) per (seed, kind, path)."""
+        digest = hashlib.blake2b(f"{self.seed}:{kind}:{path}".encode('utf-8', 'replace'), digest_size=8)
+        return int.from_bytes(digest.digest(), 'big') / 2 ** 64
+
+
+class Command:
+    """One command's worth of arguments, split into options, assignments and files."""
+
+    def __init__(self, args):
+        self.flags = set()
+        self.values = {}       # option -> last value
+        self.multi = {}        # option -> [values] for -ext / -i
+        self.efiles = []       # (bitmask, path, overwrite)
+        self.echoes = []       # (number, text)
+        self.assignments = []  # '-Tag=value' / '-Tag<src'
+        self.read_tags = []
+        self.files = []
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            lower = arg.lower()
+            if not arg.startswith('-') or arg == '-':
+                self.files.append(arg)
+            elif lower.startswith('-efile'):
+                spec = lower[6:]
+                overwrite = spec.endswith('!')
+                spec = spec.rstrip('!')
+                mask = int(spec) if spec.isdigit() else EFILE_ERRORS
+                if i + 1 < len(args):
+                    self.efiles.append((mask, args[i + 1], overwrite))
+                i += 1
+            elif lower in VALUE_OPTIONS:
+                value = args[i + 1] if i + 1 < len(args) else ''
+                if lower.startswith('-echo'):
+                    self.echoes.append((int(lower[5:] or 1), value))
+                elif lower in ('-ext', '-extension', '-i'):
+                    self.multi.setdefault(lower.replace('-extension', '-ext'), []).append(value)
+                else:
+                    self.values[lower] = value
+                i += 1
+            elif '=' in arg or '<' in arg:
+                self.assignments.append(arg)
+            elif lower in ('-ver', '-r', '-q', '-n', '-json', '-j', '-ec', '-fast', '-fast2',
+                           '-overwrite_original', '-overwrite_original_in_place', '-m', '-a', '-s'):
+                self.flags.add(lower)
+            else:
+                self.read_tags.append(arg[1:])
+            i += 1
+        self.quiet = sum(1 for arg in args if arg.lower() == '-q')
+        self.is_write = bool(self.assignments)
+
+
+def iter_target_files(command):
+    """Files named on the command line, plus folder contents with -r."""
+    extensions = {ext.lower().lstrip('.') for ext in command.multi.get('-ext', [])}
+    ignored = set(command.multi.get('-i', []))
+    for target in command.files:
+        if not os.path.isdir(target):
+            yield target
+            continue
+        walker = os.walk(target) if '-r' in command.flags else [next(os.walk(target), (target, [], []))]
+        for dirpath, dirnames, filenames in walker:
+            dirnames[:] = sorted(name for name in dirnames if name not in ignored)
+            for filename in sorted(filenames):
+                if extensions and filename.rsplit('.', 1)[-1].lower() not in extensions:
+                    continue
+                yield os.path.join(dirpath, filename)
+
+
+def source_for(pattern, path):
+    """Expands the %d %f %e placeholders of -tagsFromFile for path."""
+    directory, filename = os.path.split(path)
+    stem, _, ext = filename.rpartition('.')
+    if not stem:
+        stem, ext = filename, ''
+    return (pattern.replace('%d', directory + os.sep if directory else '')
+            .replace('%f', stem).replace('%e', ext))
+
+
+def touch_file(path):
+    """Rewrites the file through a temporary copy, as -overwrite_original does."""
+    temp_path = path + '_exiftool_tmp'
+    with open(path, 'rb') as src, open(temp_path, 'wb') as dst:
+        dst.write(src.read())
+    os.replace(temp_path, path)
+
+
+def run_command(args, config, out, err):
+    """Runs one command; returns its exit status."""
+    command = Command(args)
+    for number, text in command.echoes:
+        if number in (1, 2):
+            (out if number == 1 else err).write(text + '\n')
+    if '-ver' in command.flags:
+        out.write(FAKE_VERSION + '\n')
+        return finish(command, 0, out, err)
+
+    if config.crash_rate and config.rng.random() < config.crash_rate:
+        out.flush()
+        err.write("Fake ExifTool crashed\n")
+        err.flush()
+        os._exit(70)
+
+    pattern = command.values.get('-tagsfromfile')
+    outcome = {EFILE_ERRORS: [], EFILE_UNCHANGED: [], EFILE_UPDATED: []}
+    read_entries = []
+    for path in iter_target_files(command):
+        if config.latency or config.jitter:
+            time.sleep(config.latency + config.rng.random() * config.jitter)
+        if not os.path.isfile(path):
+            err.write(f"Error: File not found - {path}\n")
+            outcome[EFILE_ERRORS].append(path)
+            continue
+        if pattern is not None and not os.path.isfile(source_for(pattern, path)):
+            # No sidecar for this file: ExifTool warns and leaves it alone
+            if command.quiet < 2:
+                err.write(f"Warning: Error opening file - {source_for(pattern, path)}\n")
+            outcome[EFILE_UNCHANGED].append(path)
+            continue
+        if config.failure_rate and config.roll('fail', path) < config.failure_rate:
+            err.write(f"Error: Simulated write failure - {path}\n")
+            outcome[EFILE_ERRORS].append(path)
+            continue
+        if config.warning_rate and command.quiet < 2 and config.roll('warn', path) < config.warning_rate:
+            err.write(f"Warning: [minor] Simulated warning - {path}\n")
+
+        if command.is_write:
+            if config.touch:
+                try:
+                    touch_file(path)
+                except OSError as e:
+                    err.write(f"Error: {e.strerror} - {path}\n")
+                    outcome[EFILE_ERRORS].append(path)
+                    continue
+            outcome[EFILE_UPDATED].append(path)
+        else:
+            entry = {'SourceFile': path}
+            entry.update(config.read_tags)
+            read_entries.append(entry)
+
+    if read_entries:
+        if '-json' in command.flags or '-j' in command.flags:
+            out.write(json.dumps(read_entries, indent=2) + '\n')
+        else:
+            for entry in read_entries:
+                out.write(f"======== {entry['SourceFile']}\n")
+    if command.is_write and not command.quiet:
+        out.write(f"    {len(outcome[EFILE_UPDATED])} image files updated\n")
+        if outcome[EFILE_UNCHANGED]:
+            out.write(f"    {len(outcome[EFILE_UNCHANGED])} image files unchanged\n")
+        if outcome[EFILE_ERRORS]:
+            out.write(f"    {len(outcome[EFILE_ERRORS])} files weren't updated due to errors\n")
+
+    for mask, efile, overwrite in command.efiles:
+        paths = [path for bit, paths in outcome.items() if mask & bit for path in paths]
+        with open(efile, 'w' if overwrite else 'a', encoding='utf-8') as f:
+            f.writelines(path + '\n' for path in paths)
+
+    return finish(command, 1 if outcome[EFILE_ERRORS] else 0, out, err)
+
+
+def finish(command, status, out, err):
+    for number, text in command.echoes:
+        if number in (3, 4):
+            (out if number == 3 else err).write(text.replace('${status}', str(status)) + '\n')
+    return status
+
+
+def read_argfile_lines(stream):
+    for line in stream:
+        line = line.rstrip('\r\n')
+        if line and not line.startswith('#'):
+            yield line.strip()
+
+
+def run_args(lines, config, out, err, stay_open=False):
+    """Runs the commands in a stream of arguments, split at -execute[N].
+    With stay_open, each command ends with its {ready[N]} line and
+    '-stay_open False' ends the session."""
+    status = 0
+    args = []
+    pending_stay_open = False
+    for line in lines:
+        lower = line.lower()
+        if pending_stay_open:
+            pending_stay_open = False
+            if stay_open and line.lower() in ('false', '0'):
+                break
+            continue
+        if lower == '-stay_open':
+            pending_stay_open = True
+            continue
+        if lower.startswith('-execute'):
+            status = max(status, run_command(args, config, out, err))
+            args = []
+            if stay_open:
+                out.write(f"{{ready{line[8:]}}}\n")
+            out.flush()
+            err.flush()
+            continue
+        args.append(line)
+    if args and not stay_open:
+        status = max(status, run_command(args, config, out, err))
+    return status
+
+
+def main(argv):
+    config = Config()
+    if config.startup:
+        time.sleep(config.startup)
+    out, err = sys.stdout, sys.stderr
+
+    if '-stay_open' in [arg.lower() for arg in argv]:
+        position = [arg.lower() for arg in argv].index('-stay_open')
+        if position + 1 < len(argv) and argv[position + 1].lower() in ('true', '1'):
+            source = argv[argv.index('-@') + 1] if '-@' in argv else '-'
+            stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+            run_args(read_argfile_lines(stream), config, out, err, stay_open=True)
+            return 0
+
+    if '-@' in argv:
+        position = argv.index('-@')
+        with open(argv[position + 1], 'r', encoding='utf-8') as f:
+            lines = list(read_argfile_lines(f))
+        # The argfile's lines stand in for the -@ option
+        return run_args(argv[:position] + lines + argv[position + 2:], config, out, err)
+    return run_args(argv, config, out, err)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
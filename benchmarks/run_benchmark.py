@@ -0,0 +1,267 @@
+# End-to-end benchmark of batch_fixer_cli.py on a synthetic Takeout tree.
+# Generates a tree (see takeout_tree.py), runs each stage of the batch fixer
+# on it in isolation and writes a JSON report:
+#   discovery - TreeManifest.build (one scandir per folder)
+#   parsing   - read_sidecar + load_sidecar for every sidecar
+#   matching  - match_sidecar (media lookup) for every parsed sidecar
+#   planning  - plan_jobs (timezone conversion and ExifTool arguments)
+#   writing   - the chosen write engine plus the file time stage
+#   moving    - move_files_without_matching_json + organize_json_files
+# With --end-to-end, process_photos also runs on a second, identical tree, so
+# the streaming pipeline (where the stages overlap) is measured as shipped.
+# Everything runs offline; the script's JSON log lines go to /dev/null.
+# --exiftool fake swaps in fake_exiftool.py (tuned by its FAKE_EXIFTOOL_*
+# environment variables) to time only the batch fixer's own overhead.
+#
+#   python -m benchmarks.run_benchmark --files 100k --engine native --output new.json
+#   python -m benchmarks.run_benchmark --files 100k --engine native --baseline old.json
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import BUNDLED_EXIFTOOL, FAKE_EXIFTOOL, REPO_DIR, import_batch_fixer, parse_count
+from benchmarks.takeout_tree import DEFAULT_DIR_SIZE, DEFAULT_SEED, generate_tree
+
+REPORT_VERSION = 1
+ENGINES = ['stay-open', 'argfile', 'native', 'exiftool-tree']
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+# ru_maxrss is in bytes on macOS and in kilobytes on Linux
+RU_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def max_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RU_MAXRSS_UNIT / (1024 * 1024), 1)
+
+
+class StageTimer:
+    """Collects {stage: {seconds, items, items_per_second}} for the report."""
+
+    def __init__(self, quiet_log):
+        self.stages = {}
+        self.quiet_log = quiet_log
+
+    @contextlib.contextmanager
+    def stage(self, name, items=None):
+        progress(f"{name}...")
+        entry = {}
+        started = time.perf_counter()
+        with self.quiet_log():
+            yield entry
+        seconds = time.perf_counter() - started
+        count = entry.get('items', items)
+        self.stages[name] = {
+            'seconds': round(seconds, 4),
+            'items': count,
+            'items_per_second': round(count / seconds, 1) if count and seconds > 0 else None,
+        }
+        progress(f"{name}: {seconds:.3f}s")
+
+
+def progress(message):
+    print(f"[bench] {message}", file=sys.stderr, flush=True)
+
+
+def run_stages(bf, root, args, timer):
+    """Runs the batch fixer stage by stage on root; returns the result counts."""
+    is_windows = False
+    exiftool_cmd, _ = bf.exiftool_command(args.exiftool, is_windows)
+    stats = bf.PlanStats()
+
+    with timer.stage('discovery') as entry:
+        manifest = bf.TreeManifest.build(root)
+        sidecars = list(manifest.sidecars())
+        entry['items'] = sum(len(dir_index.files) for dir_index in manifest.index.values())
+
+    with timer.stage('parsing', len(sidecars)):
+        parsed = [bf.load_sidecar(*bf.read_sidecar(bf.PhotoJob(*sidecar)), stats) for sidecar in sidecars]
+        parsed = [job for job in parsed if job is not None]
+
+    with timer.stage('matching', len(parsed)):
+        matched = [bf.match_sidecar(job, manifest, stats) for job in parsed]
+        matched = [job for job in matched if job is not None]
+
+    with timer.stage('planning', len(matched)):
+        jobs = []
+        for start in range(0, len(matched), bf.PLAN_BATCH_SIZE):
+            jobs += bf.plan_jobs(matched[start:start + bf.PLAN_BATCH_SIZE], args.timezone,
+                                 is_windows, stats)
+
+    with timer.stage('writing', len(jobs)):
+        if args.engine == 'exiftool-tree':
+            _, updated, errors = bf.write_exiftool_tree(root, manifest, args.timezone, exiftool_cmd, is_windows)
+        elif args.engine == 'argfile':
+            updated, errors = bf.log_write_results(
+                bf.run_argfile_chunks(exiftool_cmd, jobs, args.chunk_size, args.workers))
+        elif args.engine == 'native':
+            updated, errors = bf.log_write_results(bf.write_native(exiftool_cmd, jobs, args.workers))
+        else:
+            with bf.ExifToolPool(exiftool_cmd, args.workers).start() as pool:
+                updated, errors = bf.log_write_results(pool.run(jobs, key=bf.media_key))
+
+    with timer.stage('moving') as entry:
+        bf.move_files_without_matching_json(root, manifest)
+        bf.organize_json_files(root, manifest)
+        # Both destination folders are indexed in the manifest as files move in
+        entry['items'] = sum(len(manifest.index[os.path.join(root, folder)].files)
+                             for folder in bf.SKIPPED_FOLDERS)
+
+    return {
+        'sidecars': len(sidecars),
+        'planned': len(jobs),
+        'updated': updated,
+        'errors': errors + stats.parse_errors + stats.plan_errors,
+        'no_timestamp': stats.no_timestamp,
+        'no_media': stats.no_media,
+    }
+
+
+def run_end_to_end(bf, root, args, timer, files):
+    with timer.stage('end_to_end', files):
+        bf.process_photos(root, args.timezone, args.exiftool, workers=args.workers,
+                          engine=args.engine, chunk_size=args.chunk_size)
+
+
+def compare_reports(baseline, report):
+    """Prints per-stage seconds of both reports and the speedup."""
+    print(f"{'stage':<12} {'baseline s':>12} {'current s':>12} {'speedup':>9}", file=sys.stderr)
+    for name, stage in report['stages'].items():
+        old = baseline.get('stages', {}).get(name)
+        if old is None:
+            print(f"{name:<12} {'-':>12} {stage['seconds']:>12.3f} {'-':>9}", file=sys.stderr)
+            continue
+        speedup = old['seconds'] / stage['seconds'] if stage['seconds'] > 0 else float('inf')
+        print(f"{name:<12} {old['seconds']:>12.3f} {stage['seconds']:>12.3f} {speedup:>8.2f}x", file=sys.stderr)
+    if baseline.get('tree', {}).get('files') != report['tree']['files']:
+        print("(tree sizes differ; compare items_per_second instead)", file=sys.stderr)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark batch_fixer_cli.py on a synthetic Takeout tree.")
+    parser.add_argument("--files", type=parse_count, default=parse_count('10k'),
+                        help="Approximate tree size in files, e.g. 1k, 100k, 1m (default: 10k)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--dir-size", type=int, default=DEFAULT_DIR_SIZE,
+                        help=f"Files per album folder (default: {DEFAULT_DIR_SIZE})")
+    parser.add_argument("--engine", choices=ENGINES, default='stay-open')
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--timezone", choices=['pacific', 'utc'], default='pacific')
+    parser.add_argument("--exiftool", default=BUNDLED_EXIFTOOL,
+                        help="ExifTool to run, passed on like the app's exiftool_path, or 'fake' "
+                             "for benchmarks/fake_exiftool.py (default: the bundled one)")
+    parser.add_argument("--verbosity", choices=['quiet', 'normal', 'verbose'], default='normal',
+                        help="Log level of the benchmarked script (its output is discarded)")
+    parser.add_argument("--end-to-end", action='store_true',
+                        help="Also time process_photos on a second copy of the tree")
+    parser.add_argument("--work-dir", default=None,
+                        help="Where to generate trees (default: the system temp folder)")
+    parser.add_argument("--keep", action='store_true', help="Keep the generated trees")
+    parser.add_argument("--output", default=None, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", default=None,
+                        help="Earlier report to compare against; the comparison is printed to stderr")
+    return parser
+
+
+def main():
+    args = build_arg_parser().parse_args()
+    if platform.system() == "Windows":
+        sys.exit("The benchmark runs on Linux/macOS only.")
+    if args.workers < 1 or args.chunk_size < 1:
+        sys.exit("--workers and --chunk-size must be at least 1")
+    if args.exiftool == 'fake':
+        args.exiftool = FAKE_EXIFTOOL
+
+    bf = import_batch_fixer()
+    bf._log_writer.verbosity = bf.LOG_LEVELS[args.verbosity]
+
+    @contextlib.contextmanager
+    def quiet_log():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            try:
+                yield
+            finally:
+                bf._log_writer.flush(summaries=True)
+
+    timer = StageTimer(quiet_log)
+    work_dir = tempfile.mkdtemp(prefix='takeout-bench-', dir=args.work_dir)
+    try:
+        progress(f"generating {args.files} files in {work_dir}")
+        started = time.perf_counter()
+        tree_stats = generate_tree(os.path.join(work_dir, 'staged'), args.files, args.seed, args.dir_size)
+        generate_seconds = time.perf_counter() - started
+        if args.end_to_end:
+            generate_tree(os.path.join(work_dir, 'end_to_end'), args.files, args.seed, args.dir_size)
+
+        results = run_stages(bf, os.path.join(work_dir, 'staged', 'Takeout', 'Google Photos'), args, timer)
+        if args.end_to_end:
+            run_end_to_end(bf, os.path.join(work_dir, 'end_to_end', 'Takeout', 'Google Photos'), args, timer,
+                           tree_stats.files)
+    finally:
+        if args.keep:
+            progress(f"trees kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    staged_seconds = sum(stage['seconds'] for name, stage in timer.stages.items() if name != 'end_to_end')
+    report = {
+        'report_version': REPORT_VERSION,
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': {
+            'engine': args.engine,
+            'workers': args.workers,
+            'chunk_size': args.chunk_size,
+            'timezone': args.timezone,
+            'verbosity': args.verbosity,
+            'exiftool': args.exiftool,
+            'fake_exiftool': {name: value for name, value in sorted(os.environ.items())
+                              if name.startswith('FAKE_EXIFTOOL_')},
+        },
+        'tree': dict(tree_stats.as_dict(), seed=args.seed, dir_size=args.dir_size,
+                     generate_seconds=round(generate_seconds, 3)),
+        'stages': timer.stages,
+        'staged_seconds': round(staged_seconds, 4),
+        'results': results,
+        # The script's own per-call histograms, over all stages above
+        'timers': bf.stage_timings(),
+        'max_rss_mb': max_rss_mb(),
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
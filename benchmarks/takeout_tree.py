@@ -0,0 +1,334 @@
+# Deterministic synthetic Takeout trees for benchmarking.
+# The same seed and size always produce the same names, sidecar contents and
+# file bytes. Media files are tiny but structurally valid stand-ins:
+#   JPEG - EXIF with DateTimeOriginal, OffsetTimeOriginal and GPS, so the
+#          native engine can patch them in place, plus an 8x8 baseline scan
+#   HEIC - ftyp + meta (iinf/iloc/iref) + mdat, with an Exif item holding
+#          the JPEG stand-in's tags, which ExifTool can update
+#   MP4  - ftyp + moov (mvhd/tkhd/mdhd) + mdat
+# Sidecars use every suffix in SIDECAR_PATTERNS, with the media name cut short
+# where the sidecar name would pass Takeout's length limit, plus Takeout's "(1)" duplicates (IMG.jpg.supplemental-metadata(1).json
+# next to IMG(1).jpg), orphan media, sidecars without a timestamp and one
+# album-level metadata.json per folder.
+
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+from benchmarks import import_batch_fixer, parse_count
+
+DEFAULT_SEED = 2024
+DEFAULT_DIR_SIZE = 1000  # files per album folder
+
+# Per media item: (kind, weight)
+KIND_WEIGHTS = [('jpg', 70), ('heic', 15), ('mp4', 15)]
+EXTENSIONS = {
+    'jpg': [('.jpg', 80), ('.JPG', 10), ('.jpeg', 5), ('.MP.jpg', 5)],
+    'heic': [('.HEIC', 90), ('.heic', 10)],
+    'mp4': [('.mp4', 80), ('.MP4', 10), ('.mov', 10)],
+}
+# Share of the full suffix; the shortened variants split the rest evenly
+FULL_SUFFIX_WEIGHT = 60
+ORPHAN_RATE = 0.04
+DUPLICATE_RATE = 0.03
+NO_TIMESTAMP_RATE = 0.01
+DESCRIPTION_RATE = 0.2
+NO_GPS_RATE = 0.3
+
+FIRST_TIMESTAMP = 946684800   # 2000-01-01
+LAST_TIMESTAMP = 1767225600   # 2026-01-01
+STAND_IN_DATE = b'2000:01:01 00:00:00'
+SIDECAR_NAME_LIMIT = 46  # characters Takeout keeps before '.json'
+
+
+# --- Media Stand-ins ---
+
+def _tiff_ifd(entries, ifd_offset, data_offset, endian='>'):
+    """Packs one IFD (entries: (tag, type, count, value bytes)); values over
+    4 bytes go to data_offset. Returns (ifd bytes, data bytes)."""
+    ifd = struct.pack(endian + 'H', len(entries))
+    data = b''
+    for tag, type_id, count, value in sorted(entries):
+        if len(value) <= 4:
+            field = value.ljust(4, b'\x00')
+        else:
+            field = struct.pack(endian + 'L', data_offset + len(data))
+            data += value + (b'\x00' if len(value) % 2 else b'')
+        ifd += struct.pack(endian + 'HHL', tag, type_id, count) + field
+    ifd += struct.pack(endian + 'L', 0)
+    return ifd, data
+
+
+def _ifd_size(entries):
+    return 2 + 12 * len(entries) + 4
+
+
+def _exif_tiff(endian='>'):
+    """TIFF block with IFD0 (ModifyDate), ExifIFD (DateTimeOriginal,
+    CreateDate, OffsetTimeOriginal) and a GPS IFD, big-endian by default."""
+    ascii_date = STAND_IN_DATE + b'\x00'
+    rational3 = struct.pack(endian + '6L', 0, 1, 0, 1, 0, 10000)
+    exif_entries = [
+        (0x9003, 2, 20, ascii_date),
+        (0x9004, 2, 20, ascii_date),
+        (0x9011, 2, 7, b'+00:00\x00'),
+    ]
+    gps_entries = [
+        (0x0000, 1, 4, b'\x02\x03\x00\x00'),
+        (0x0001, 2, 2, b'N\x00'),
+        (0x0002, 5, 3, rational3),
+        (0x0003, 2, 2, b'E\x00'),
+        (0x0004, 5, 3, rational3),
+    ]
+    # Layout: header | IFD0 | IFD0 data | ExifIFD | data | GPS IFD | data
+    ifd0_offset = 8
+    ifd0_entries = [(0x0132, 2, 20, ascii_date), (0x8769, 4, 1, b''), (0x8825, 4, 1, b'')]
+    ifd0_data_offset = ifd0_offset + _ifd_size(ifd0_entries)
+    exif_offset = ifd0_data_offset + 20
+    exif_ifd, exif_data = _tiff_ifd(exif_entries, exif_offset, exif_offset + _ifd_size(exif_entries), endian)
+    gps_offset = exif_offset + len(exif_ifd) + len(exif_data)
+    gps_ifd, gps_data = _tiff_ifd(gps_entries, gps_offset, gps_offset + _ifd_size(gps_entries), endian)
+    ifd0_entries[1] = (0x8769, 4, 1, struct.pack(endian + 'L', exif_offset))
+    ifd0_entries[2] = (0x8825, 4, 1, struct.pack(endian + 'L', gps_offset))
+    ifd0, ifd0_data = _tiff_ifd(ifd0_entries, ifd0_offset, ifd0_data_offset, endian)
+
+    header = b'MM\x00\x2a' if endian == '>' else b'II\x2a\x00'
+    return header + struct.pack(endian + 'L', ifd0_offset) + ifd0 + ifd0_data + exif_ifd + exif_data + gps_ifd + gps_data
+
+
+def _exif_app1(endian='>'):
+    payload = b'Exif\x00\x00' + _exif_tiff(endian)
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def _jpeg_segment(marker, payload):
+    return bytes([0xFF, marker]) + struct.pack('>H', len(payload) + 2) + payload
+
+
+def jpeg_stand_in(endian='>'):
+    """8x8 grey baseline JPEG: one DC-only block coded with one-symbol tables."""
+    huffman_one_symbol = bytes([1] + [0] * 15) + b'\x00'
+    return b''.join([
+        b'\xff\xd8',
+        _exif_app1(endian),
+        _jpeg_segment(0xDB, b'\x00' + b'\x01' * 64),                          # DQT
+        _jpeg_segment(0xC0, b'\x08' + struct.pack('>HH', 8, 8) + b'\x01\x01\x11\x00'),  # SOF0
+        _jpeg_segment(0xC4, b'\x00' + huffman_one_symbol + b'\x10' + huffman_one_symbol),  # DHT
+        _jpeg_segment(0xDA, b'\x01\x01\x00\x00\x3f\x00'),                      # SOS
+        b'\x3f',  # DC category 0, EOB, padded with ones
+        b'\xff\xd9',
+    ])
+
+
+def _box(box_type, payload):
+    return struct.pack('>I4s', len(payload) + 8, box_type) + payload
+
+
+def _full_box(box_type, payload, version=0, flags=0):
+    return _box(box_type, struct.pack('>I', (version << 24) | flags) + payload)
+
+
+IDENTITY_MATRIX = struct.pack('>9l', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+def mp4_stand_in():
+    """One empty video track; every header date is 2000-01-01 UTC."""
+    qt_time = FIRST_TIMESTAMP + 2082844800
+    mvhd = _full_box(b'mvhd', struct.pack('>IIII', qt_time, qt_time, 1000, 0)
+                     + struct.pack('>IH', 0x10000, 0x100) + b'\x00' * 10 + IDENTITY_MATRIX
+                     + b'\x00' * 24 + struct.pack('>I', 2))
+    tkhd = _full_box(b'tkhd', struct.pack('>IIIII', qt_time, qt_time, 1, 0, 0) + b'\x00' * 8
+                     + struct.pack('>hhhH', 0, 0, 0, 0) + IDENTITY_MATRIX + struct.pack('>II', 8 << 16, 8 << 16),
+                     flags=3)
+    mdhd = _full_box(b'mdhd', struct.pack('>IIIIHH', qt_time, qt_time, 1000, 0, 0x55C4, 0))
+    hdlr = _full_box(b'hdlr', b'\x00' * 4 + b'vide' + b'\x00' * 12 + b'\x00')
+    moov = _box(b'moov', mvhd + _box(b'trak', tkhd + _box(b'mdia', mdhd + hdlr)))
+    return _box(b'ftyp', b'isom' + struct.pack('>I', 512) + b'isomiso2mp41') + moov + _box(b'mdat', b'\x00' * 16)
+
+
+def _heic_meta(image_offset, image_length, exif_offset, exif_length):
+    hdlr = _full_box(b'hdlr', b'\x00' * 4 + b'pict' + b'\x00' * 12 + b'\x00')
+    pitm = _full_box(b'pitm', struct.pack('>H', 1))
+    iinf = _full_box(b'iinf', struct.pack('>H', 2)
+                     + _full_box(b'infe', struct.pack('>HH4s', 1, 0, b'hvc1') + b'\x00', version=2)
+                     + _full_box(b'infe', struct.pack('>HH4s', 2, 0, b'Exif') + b'\x00', version=2))
+    iref = _full_box(b'iref', _box(b'cdsc', struct.pack('>HHH', 2, 1, 1)))  # Exif item describes item 1
+    # 4-byte offsets and lengths, no base offset, one extent per item
+    iloc = _full_box(b'iloc', struct.pack('>BBH', 0x44, 0x00, 2)
+                     + struct.pack('>HHHII', 1, 0, 1, image_offset, image_length)
+                     + struct.pack('>HHHII', 2, 0, 1, exif_offset, exif_length))
+    return _full_box(b'meta', hdlr + pitm + iloc + iinf + iref)
+
+
+def heic_stand_in():
+    """HEIF whose primary item is an (empty) HEVC image with an Exif item
+    holding the same tags as the JPEG stand-in, so ExifTool can update it."""
+    ftyp = _box(b'ftyp', b'heic' + struct.pack('>I', 0) + b'mif1heic')
+    image = b'\x00' * 16
+    exif = struct.pack('>I', 0) + _exif_tiff()  # offset to the TIFF header, then the TIFF block
+    # The meta box has the same size whatever offsets it holds
+    mdat_data = len(ftyp) + len(_heic_meta(0, 0, 0, 0)) + 8
+    meta = _heic_meta(mdat_data, len(image), mdat_data + len(image), len(exif))
+    return ftyp + meta + _box(b'mdat', image + exif)
+
+
+STAND_INS = {'jpg': jpeg_stand_in(), 'heic': heic_stand_in(), 'mp4': mp4_stand_in()}
+
+
+# --- Tree Generation ---
+
+def _weighted(rng, choices):
+    total = sum(weight for _, weight in choices)
+    pick = rng.random() * total
+    for value, weight in choices:
+        pick -= weight
+        if pick < 0:
+            return value
+    return choices[-1][0]
+
+
+def _media_stem(rng, kind, timestamp, n):
+    stamp = time.strftime('%Y%m%d_%H%M%S', time.gmtime(timestamp))
+    style = rng.random()
+    if style < 0.1:
+        # Long enough that Takeout shortens the sidecar suffix
+        return f"Screenshot_{stamp}_com.example.photoeditor.app_{n}"
+    if kind == 'mp4':
+        return f"VID_{stamp}_{n}"
+    if style < 0.4:
+        return f"PXL_{stamp}_{n}"
+    return f"IMG_{n:06d}"
+
+
+def _sidecar_json(rng, title, timestamp):
+    data = {
+        'title': title,
+        'description': f"Synthetic photo {title}" if rng.random() < DESCRIPTION_RATE else '',
+        'imageViews': str(rng.randrange(100)),
+        'creationTime': {'timestamp': str(timestamp + rng.randrange(86400 * 30))},
+    }
+    if rng.random() >= NO_TIMESTAMP_RATE:
+        data['photoTakenTime'] = {'timestamp': str(timestamp)}
+    if rng.random() < NO_GPS_RATE:
+        geo = {'latitude': 0.0, 'longitude': 0.0, 'altitude': 0.0}
+    else:
+        geo = {'latitude': round(rng.uniform(-60, 70), 6),
+               'longitude': round(rng.uniform(-180, 180), 6),
+               'altitude': round(rng.uniform(0, 500), 1)}
+    data['geoData'] = geo
+    data['geoDataExif'] = geo
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+class TreeStats:
+    def __init__(self):
+        self.files = 0
+        self.media = 0
+        self.sidecars = 0
+        self.directories = 0
+        self.by_kind = {}
+        self.by_suffix = {}
+        self.truncated = 0
+        self.duplicates = 0
+        self.orphans = 0
+        self.no_timestamp = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def generate_tree(root, files, seed=DEFAULT_SEED, dir_size=DEFAULT_DIR_SIZE):
+    """Writes a synthetic Takeout tree of about `files` files under
+    root/Takeout/Google Photos and returns its TreeStats."""
+    sidecar_patterns = import_batch_fixer().SIDECAR_PATTERNS
+    suffix_weights = [(sidecar_patterns[0], FULL_SUFFIX_WEIGHT)]
+    short_weight = (100 - FULL_SUFFIX_WEIGHT) / (len(sidecar_patterns) - 1)
+    suffix_weights += [(pattern, short_weight) for pattern in sidecar_patterns[1:]]
+
+    rng = random.Random(seed)
+    stats = TreeStats()
+    photos_dir = os.path.join(root, 'Takeout', 'Google Photos')
+    folder = None
+    folder_start = 0
+    n = 0
+
+    folder_names = set()
+
+    def write(name, data):
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(data)
+        folder_names.add(name)
+        stats.files += 1
+
+    while stats.files < files:
+        if folder is None or stats.files - folder_start >= dir_size:
+            stats.directories += 1
+            folder = os.path.join(photos_dir, f"Photos from {2000 + stats.directories % 26} ({stats.directories:05d})")
+            os.makedirs(folder, exist_ok=True)
+            folder_names.clear()
+            write('metadata.json',
+                  json.dumps({'title': os.path.basename(folder)}).encode('utf-8'))
+            folder_start = stats.files
+
+        n += 1
+        kind = _weighted(rng, KIND_WEIGHTS)
+        ext = _weighted(rng, EXTENSIONS[kind])
+        timestamp = rng.randrange(FIRST_TIMESTAMP, LAST_TIMESTAMP)
+        media_name = _media_stem(rng, kind, timestamp, n) + ext
+        write(media_name, STAND_INS[kind])
+        stats.media += 1
+        stats.by_kind[kind] = stats.by_kind.get(kind, 0) + 1
+
+        roll = rng.random()
+        if roll < ORPHAN_RATE:
+            stats.orphans += 1
+            continue
+        if roll < ORPHAN_RATE + DUPLICATE_RATE:
+            # Takeout puts the counter after the suffix for the sidecar
+            stem, dot_ext = os.path.splitext(media_name)
+            write(f"{stem}(1){dot_ext}", STAND_INS[kind])
+            write(f"{media_name}{sidecar_patterns[0][:-5]}(1).json",
+                  _sidecar_json(rng, media_name, timestamp))
+            stats.media += 1
+            stats.duplicates += 1
+
+        suffix = _weighted(rng, suffix_weights)
+        base = media_name
+        room = SIDECAR_NAME_LIMIT - (len(suffix) - len('.json'))
+        if len(media_name) > room:
+            truncated = media_name[:room]
+            # A prefix shared with another media file would match either; keep the full name
+            if not any(name != media_name and name.startswith(truncated) for name in folder_names):
+                base = truncated
+                stats.truncated += 1
+        sidecar = _sidecar_json(rng, media_name, timestamp)
+        if b'photoTakenTime' not in sidecar:
+            stats.no_timestamp += 1
+        write(base + suffix, sidecar)
+        stats.sidecars += 1
+        stats.by_suffix[suffix] = stats.by_suffix.get(suffix, 0) + 1
+    return stats
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic Takeout tree.")
+    parser.add_argument("root", help="Folder to create the tree in")
+    parser.add_argument("--files", type=parse_count, default=parse_count('1k'),
+                        help="Approximate number of files, e.g. 1k, 100k, 1m (default: 1k)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--dir-size", type=int, default=DEFAULT_DIR_SIZE,
+                        help=f"Files per album folder (default: {DEFAULT_DIR_SIZE})")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    started = time.perf_counter()
+    tree_stats = generate_tree(args.root, args.files, args.seed, args.dir_size)
+    json.dump(dict(tree_stats.as_dict(), seconds=round(time.perf_counter() - started, 3)),
+              sys.stdout, indent=2)
+    print()
@@ -86,11 +86,16 @@ ipcMain.on('start-batch-script', (event, { folderPath, timezoneMode }) => {
   const scriptFullPath = path.join(assetsPath, scriptName);
   const exiftoolPath = getExifToolPath();
 
+  // 'auto-gps' picks each photo's zone from its GPS; photos without GPS keep UTC
+  const args = timezoneMode === 'auto-gps'
+    ? [folderPath, 'utc', exiftoolPath, '--tz', 'auto-gps']
+    : [folderPath, timezoneMode, exiftoolPath];
+
   const options = {
     mode: 'json',
     pythonPath: 'python3',
     scriptPath: assetsPath,
-    args: [folderPath, timezoneMode, exiftoolPath],
+    args: args,
   };
 
   if (!fs.existsSync(scriptFullPath)) {
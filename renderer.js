@@ -55,6 +55,50 @@ const batchClearBtn = document.getElementById('batch-clear-btn');
 const batchFolderPath = document.getElementById('batch-folder-path');
 const batchLog = document.getElementById('batch-log-container');
 const batchProgressBar = document.querySelector('#batch-view .progress-bar');
+const batchProgressInner = batchProgressBar.querySelector('.progress-bar-inner');
+const batchProgressLabel = document.querySelector('#batch-view .progress-label');
+
+// --- Progress Bar Helpers ---
+function formatBytes(bytes) {
+  const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+  let i = 0;
+  while (bytes >= 1024 && i < units.length - 1) {
+    bytes /= 1024;
+    i++;
+  }
+  return `${bytes.toFixed(i === 0 ? 0 : 1)} ${units[i]}`;
+}
+
+function formatDuration(seconds) {
+  seconds = Math.round(seconds);
+  if (seconds < 60) return `${seconds}s`;
+  const minutes = Math.floor(seconds / 60);
+  if (minutes < 60) return `${minutes}m ${seconds % 60}s`;
+  return `${Math.floor(minutes / 60)}h ${minutes % 60}m`;
+}
+
+// Starts indeterminate; the first progress event switches it to a real bar
+function resetBatchProgress(visible) {
+  batchProgressBar.classList.remove('determinate');
+  batchProgressInner.style.width = '';
+  batchProgressBar.style.display = visible ? 'block' : 'none';
+  batchProgressLabel.textContent = '';
+  batchProgressLabel.style.display = 'none';
+}
+
+function updateBatchProgress(progress) {
+  const { processed, total, total_known, bytes_written, files_per_second, eta_seconds } = progress;
+  const percent = total > 0 ? Math.min(100, (processed / total) * 100) : 0;
+  batchProgressBar.classList.add('determinate');
+  batchProgressInner.style.width = `${percent.toFixed(1)}%`;
+
+  let label = `${processed} / ${total}${total_known ? '' : '+'} files`;
+  label += ` · ${formatBytes(bytes_written)} written`;
+  label += ` · ${files_per_second.toFixed(1)} files/s`;
+  if (eta_seconds !== null && processed < total) label += ` · ${formatDuration(eta_seconds)} left`;
+  batchProgressLabel.textContent = label;
+  batchProgressLabel.style.display = 'block';
+}
 
 batchBrowseBtn.addEventListener('click', async () => {
   const folderPath = await window.electronAPI.selectFolder();
@@ -83,7 +127,7 @@ batchStartBtn.addEventListener('click', () => {
   const confirmed = confirm(`Start processing photos in:\n${selectedFolderPath}\n\nTimezone mode: ${timezoneMode.toUpperCase()}\n\nThis will modify your photo files and organize JSONs. Continue?`);
   if (confirmed) {
     batchStartBtn.disabled = true;
-    batchProgressBar.style.display = 'block';
+    resetBatchProgress(true);
     batchLog.innerHTML = '';
     
     window.electronAPI.startBatchScript({
@@ -102,7 +146,9 @@ window.electronAPI.onBatchLog((message) => {
   if (message.tag === 'final_marker' && message.text === 'PROCESSING_COMPLETE') {
     addLog('batch-log-container', '🎉 Processing Complete!', 'success');
     batchStartBtn.disabled = false;
-    batchProgressBar.style.display = 'none';
+    resetBatchProgress(false);
+  } else if (message.tag === 'progress' && message.progress) {
+    updateBatchProgress(message.progress);
   } else {
     addLog('batch-log-container', message.text, message.tag);
   }
@@ -112,7 +158,7 @@ window.electronAPI.onBatchLog((message) => {
 window.electronAPI.onBatchComplete((result) => {
   console.log("Batch script process ended.");
   batchStartBtn.disabled = false; // Ensure button is re-enabled
-  batchProgressBar.style.display = 'none';
+  resetBatchProgress(false);
 });
 
 
@@ -0,0 +1,32 @@
+# Tests import the app's modules the way it runs them (assets/ on sys.path)
+# and build their fixtures with the benchmark stand-in generators.
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(REPO_DIR, 'assets')
+for path in (REPO_DIR, ASSETS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+BUNDLED_EXIFTOOL = os.path.join(ASSETS_DIR, 'exiftool')
+
+
+@pytest.fixture
+def read_tags():
+    """Reads tags back with the bundled ExifTool (numeric values, -G1 group names)."""
+    perl = shutil.which('perl')
+    if perl is None:
+        pytest.skip("the bundled ExifTool needs perl")
+
+    def read(path, *tags):
+        result = subprocess.run([perl, BUNDLED_EXIFTOOL, '-json', '-n', '-G1', *tags, path],
+                                capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)[0]
+    return read
@@ -0,0 +1,185 @@
+import calendar
+import struct
+
+import pytest
+
+from benchmarks.takeout_tree import FIRST_TIMESTAMP, _box, _full_box, jpeg_stand_in, mp4_stand_in
+from native_writers import QUICKTIME_EPOCH_OFFSET, patch_jpeg_exif, patch_quicktime_dates
+
+DATETIME = '2021:07:04 18:30:05'
+TIMESTAMP = calendar.timegm((2021, 7, 4, 18, 30, 5))
+
+
+def write_file(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def assert_falls_back(patch, path, *args):
+    """The patcher declines and leaves every byte of the file as it was."""
+    with open(path, 'rb') as f:
+        before = f.read()
+    assert patch(path, *args) is False
+    with open(path, 'rb') as f:
+        assert f.read() == before
+
+
+# --- JPEG / EXIF ---
+
+@pytest.mark.parametrize('endian', ['>', '<'])
+def test_jpeg_round_trip(tmp_path, read_tags, endian):
+    path = write_file(tmp_path, 'photo.jpg', jpeg_stand_in(endian))
+    values = {'DateTimeOriginal': DATETIME, 'CreateDate': DATETIME,
+              'ModifyDate': DATETIME, 'OffsetTimeOriginal': '-07:00'}
+    assert patch_jpeg_exif(path, values, gps=(37.774929, -122.419416)) is True
+
+    tags = read_tags(path, '-ExifByteOrder', '-DateTimeOriginal', '-CreateDate', '-ModifyDate',
+                     '-OffsetTimeOriginal', '-GPS:all')
+    assert tags['File:ExifByteOrder'] == ('MM' if endian == '>' else 'II')
+    assert tags['ExifIFD:DateTimeOriginal'] == DATETIME
+    assert tags['ExifIFD:CreateDate'] == DATETIME
+    assert tags['IFD0:ModifyDate'] == DATETIME
+    assert tags['ExifIFD:OffsetTimeOriginal'] == '-07:00'
+    assert tags['GPS:GPSLatitudeRef'] == 'N'
+    assert tags['GPS:GPSLongitudeRef'] == 'W'
+    assert tags['GPS:GPSLatitude'] == pytest.approx(37.774929, abs=1e-6)
+    assert tags['GPS:GPSLongitude'] == pytest.approx(122.419416, abs=1e-6)
+
+
+def test_jpeg_gps_rounding_carries_into_minutes(tmp_path, read_tags):
+    path = write_file(tmp_path, 'photo.jpg', jpeg_stand_in())
+    assert patch_jpeg_exif(path, {}, gps=(-33.99999999, 151.0)) is True
+    tags = read_tags(path, '-GPS:all')
+    assert tags['GPS:GPSLatitudeRef'] == 'S'
+    assert tags['GPS:GPSLatitude'] == pytest.approx(34.0, abs=1e-6)
+
+
+def test_jpeg_without_exif_falls_back(tmp_path):
+    data = jpeg_stand_in()
+    app1_length = struct.unpack_from('>H', data, 4)[0]
+    path = write_file(tmp_path, 'plain.jpg', data[:2] + data[4 + app1_length:])
+    assert_falls_back(patch_jpeg_exif, path, {'DateTimeOriginal': DATETIME})
+
+
+def test_jpeg_missing_tag_falls_back(tmp_path):
+    # Drop the GPS IFD pointer from IFD0 (the last of its three entries)
+    data = bytearray(jpeg_stand_in())
+    ifd0 = 12 + 8
+    assert struct.unpack_from('>H', data, ifd0)[0] == 3
+    struct.pack_into('>H', data, ifd0, 2)
+    path = write_file(tmp_path, 'no_gps.jpg', bytes(data))
+    assert_falls_back(patch_jpeg_exif, path, {'DateTimeOriginal': DATETIME}, (1.0, 2.0))
+    # The dates alone can still be patched
+    assert patch_jpeg_exif(path, {'DateTimeOriginal': DATETIME}) is True
+
+
+def test_jpeg_wrong_value_length_falls_back(tmp_path):
+    path = write_file(tmp_path, 'photo.jpg', jpeg_stand_in())
+    assert_falls_back(patch_jpeg_exif, path, {'DateTimeOriginal': '2021:07:04'})
+    assert_falls_back(patch_jpeg_exif, path, {'OffsetTimeOriginal': '+5:30'})
+
+
+@pytest.mark.parametrize('data', [b'', b'\xff\xd8', b'\xff\xd8\xff', b'not a jpeg at all',
+                                  b'\xff\xd8\xff\xe1\xff\xff' + b'Exif\x00\x00MM\x00\x2a'])
+def test_jpeg_garbage_falls_back(tmp_path, data):
+    path = write_file(tmp_path, 'bad.jpg', data)
+    assert_falls_back(patch_jpeg_exif, path, {'DateTimeOriginal': DATETIME})
+
+
+def test_jpeg_truncated_never_raises(tmp_path):
+    data = jpeg_stand_in()
+    for length in range(len(data)):
+        path = write_file(tmp_path, 'cut.jpg', data[:length])
+        if not patch_jpeg_exif(path, {'DateTimeOriginal': DATETIME}, (1.0, 2.0)):
+            assert (tmp_path / 'cut.jpg').read_bytes() == data[:length]
+
+
+def test_jpeg_corrupt_offsets_fall_back(tmp_path):
+    data = jpeg_stand_in()
+    for position in range(12, 12 + 120):
+        corrupt = bytearray(data)
+        corrupt[position] ^= 0xFF
+        path = write_file(tmp_path, 'corrupt.jpg', bytes(corrupt))
+        if not patch_jpeg_exif(path, {'DateTimeOriginal': DATETIME}, (1.0, 2.0)):
+            assert (tmp_path / 'corrupt.jpg').read_bytes() == bytes(corrupt)
+
+
+# --- QuickTime / ISO-BMFF ---
+
+QUICKTIME_TAGS = ('-QuickTime:CreateDate', '-QuickTime:TrackCreateDate', '-QuickTime:MediaCreateDate')
+
+
+def assert_quicktime_dates(tags, expected):
+    assert tags['QuickTime:CreateDate'] == expected
+    assert tags['Track1:TrackCreateDate'] == expected
+    assert tags['Track1:MediaCreateDate'] == expected
+
+
+def mp4_v1_stand_in(track_version=1):
+    """mp4_stand_in with a version 1 (64-bit times) mvhd, and tkhd/mdhd of track_version."""
+    qt_time = FIRST_TIMESTAMP + QUICKTIME_EPOCH_OFFSET
+    matrix = struct.pack('>9l', 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    mvhd = _full_box(b'mvhd', struct.pack('>QQIQ', qt_time, qt_time, 1000, 0)
+                     + struct.pack('>IH', 0x10000, 0x100) + b'\x00' * 10 + matrix
+                     + b'\x00' * 24 + struct.pack('>I', 2), version=1)
+    times = '>QQ' if track_version else '>II'
+    tkhd = _full_box(b'tkhd', struct.pack(times, qt_time, qt_time)
+                     + struct.pack('>II', 1, 0) + struct.pack('>Q' if track_version else '>I', 0)
+                     + b'\x00' * 8 + struct.pack('>hhhH', 0, 0, 0, 0) + matrix
+                     + struct.pack('>II', 8 << 16, 8 << 16), version=track_version, flags=3)
+    mdhd = _full_box(b'mdhd', struct.pack(times, qt_time, qt_time) + struct.pack('>I', 1000)
+                     + struct.pack('>Q' if track_version else '>I', 0) + struct.pack('>HH', 0x55C4, 0),
+                     version=track_version)
+    hdlr = _full_box(b'hdlr', b'\x00' * 4 + b'vide' + b'\x00' * 12 + b'\x00')
+    moov = _box(b'moov', mvhd + _box(b'trak', tkhd + _box(b'mdia', mdhd + hdlr)))
+    return _box(b'ftyp', b'qt  \x00\x00\x02\x00qt  ') + moov + _box(b'mdat', b'\x00' * 16)
+
+
+def test_quicktime_v0_round_trip(tmp_path, read_tags):
+    path = write_file(tmp_path, 'clip.mp4', mp4_stand_in())
+    assert patch_quicktime_dates(path, TIMESTAMP) is True
+    assert_quicktime_dates(read_tags(path, *QUICKTIME_TAGS), DATETIME)
+
+
+def test_quicktime_v1_round_trip(tmp_path, read_tags):
+    path = write_file(tmp_path, 'clip.mov', mp4_v1_stand_in())
+    assert patch_quicktime_dates(path, TIMESTAMP) is True
+    assert_quicktime_dates(read_tags(path, *QUICKTIME_TAGS), DATETIME)
+
+
+def test_quicktime_dates_past_32_bits(tmp_path, read_tags):
+    timestamp = calendar.timegm((2045, 1, 2, 3, 4, 5))
+    v1 = write_file(tmp_path, 'v1.mov', mp4_v1_stand_in())
+    assert patch_quicktime_dates(v1, timestamp) is True
+    assert_quicktime_dates(read_tags(v1, *QUICKTIME_TAGS), '2045:01:02 03:04:05')
+    # Any version 0 box, which cannot hold the date, means nothing is written
+    assert_falls_back(patch_quicktime_dates, write_file(tmp_path, 'v0.mp4', mp4_stand_in()), timestamp)
+    assert_falls_back(patch_quicktime_dates, write_file(tmp_path, 'mixed.mov', mp4_v1_stand_in(0)), timestamp)
+
+
+def test_quicktime_unknown_version_falls_back(tmp_path):
+    data = bytearray(mp4_stand_in())
+    data[data.index(b'mvhd') + 4] = 2
+    path = write_file(tmp_path, 'clip.mp4', bytes(data))
+    assert_falls_back(patch_quicktime_dates, path, TIMESTAMP)
+
+
+def test_quicktime_without_moov_falls_back(tmp_path):
+    path = write_file(tmp_path, 'clip.mp4', _box(b'ftyp', b'isom\x00\x00\x02\x00') + _box(b'mdat', b'\x00' * 32))
+    assert_falls_back(patch_quicktime_dates, path, TIMESTAMP)
+
+
+@pytest.mark.parametrize('data', [b'', b'\x00' * 7, b'garbage garbage garbage',
+                                  b'\x00\x00\x00\x01moov', b'\x00\x00\x00\x04moov'])
+def test_quicktime_garbage_falls_back(tmp_path, data):
+    path = write_file(tmp_path, 'bad.mp4', data)
+    assert_falls_back(patch_quicktime_dates, path, TIMESTAMP)
+
+
+def test_quicktime_truncated_falls_back(tmp_path):
+    data = mp4_stand_in()
+    moov_end = data.index(b'mdat') - 4
+    for length in range(moov_end):
+        path = write_file(tmp_path, 'cut.mp4', data[:length])
+        assert_falls_back(patch_quicktime_dates, path, TIMESTAMP)
@@ -0,0 +1,128 @@
+import json
+import math
+import os
+import random
+
+import pytest
+
+from timezone_index import TIMEZONE_DATA_FILENAME, TimezoneIndex, _point_in_rings
+
+BUNDLED_DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'assets', TIMEZONE_DATA_FILENAME)
+
+
+def box(min_x, min_y, max_x, max_y):
+    return [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y)]
+
+
+def lookup_uncached(index, latitude, longitude):
+    index.cache.clear()
+    return index.lookup(latitude, longitude)
+
+
+def test_points_on_cell_edges():
+    index = TimezoneIndex()
+    index.add_polygon('Zone/A', [box(0.5, 0.5, 2.5, 2.5)])
+    # Grid lines and corners inside the polygon
+    for latitude, longitude in [(1.0, 1.0), (1.5, 2.0), (2.0, 1.5), (2.0, 2.0), (1.0, 0.75)]:
+        assert lookup_uncached(index, latitude, longitude) == 'Zone/A'
+    # Grid lines outside it
+    for latitude, longitude in [(3.0, 1.0), (1.0, 3.0), (0.0, 1.0), (1.0, 0.0)]:
+        assert lookup_uncached(index, latitude, longitude) is None
+
+
+def test_polygon_with_hole():
+    index = TimezoneIndex()
+    # The hole spans four cells and has a corner on the grid point (2, 2)
+    index.add_polygon('Zone/A', [box(0.0, 0.0, 4.0, 4.0), box(1.5, 1.5, 2.5, 2.5)])
+    index.add_polygon('Zone/Hole', [box(1.5, 1.5, 2.5, 2.5)])
+    assert lookup_uncached(index, 2.0, 2.0) == 'Zone/Hole'
+    assert lookup_uncached(index, 1.6, 2.4) == 'Zone/Hole'
+    assert lookup_uncached(index, 1.4, 2.0) == 'Zone/A'
+    assert lookup_uncached(index, 3.5, 0.5) == 'Zone/A'
+
+
+def test_polygon_split_at_the_antimeridian():
+    index = TimezoneIndex()
+    # GeoJSON stores a zone crossing 180 degrees as two polygons
+    index.add_polygon('Pacific/Fiji', [box(177.0, -19.0, 180.0, -16.0)])
+    index.add_polygon('Pacific/Fiji', [box(-180.0, -19.0, -178.0, -16.0)])
+    for longitude in (179.5, 180.0, -180.0, -179.5, -178.5, 540.0):
+        assert lookup_uncached(index, -17.5, longitude) == 'Pacific/Fiji'
+    assert lookup_uncached(index, -17.5, -177.5) is None
+    assert lookup_uncached(index, -17.5, 176.5) is None
+
+
+def test_cell_covered_by_one_polygon():
+    index = TimezoneIndex()
+    index.add_polygon('Zone/Big', [box(-10.0, -10.0, 9.5, 9.5)])
+    assert lookup_uncached(index, 3.5, 4.5) == 'Zone/Big'
+    assert index.covering[(4, 3)] == 'Zone/Big'
+    # A cell the border runs through is not covered
+    assert lookup_uncached(index, 9.2, 9.2) == 'Zone/Big'
+    assert lookup_uncached(index, 9.2, 9.7) is None
+    assert index.covering[(9, 9)] is None
+
+
+def test_overlapping_polygons_first_added_wins():
+    index = TimezoneIndex()
+    index.add_polygon('Zone/Small', [box(0.2, 0.2, 0.6, 0.6)])
+    index.add_polygon('Zone/Big', [box(-5.0, -5.0, 5.0, 5.0)])
+    # Big covers the whole cell, but Small was added first
+    assert lookup_uncached(index, 0.4, 0.4) == 'Zone/Small'
+    assert lookup_uncached(index, 0.8, 0.8) == 'Zone/Big'
+
+
+def star(rng, center_x, center_y, vertices, min_radius, max_radius):
+    """A random star-shaped (concave) ring around a center."""
+    ring = []
+    for n in range(vertices):
+        radius = rng.uniform(min_radius, max_radius)
+        angle = 2 * math.pi * n / vertices
+        ring.append((center_x + radius * math.cos(angle), center_y + radius * math.sin(angle)))
+    return ring
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_unclipped_point_in_polygon(seed):
+    rng = random.Random(seed)
+    polygons = [
+        ('Zone/A', [star(rng, 0.0, 0.0, rng.randint(3, 80), 0.3, 4.0)]),
+        ('Zone/B', [star(rng, 3.0, 1.0, rng.randint(3, 80), 0.5, 3.0),
+                    star(rng, 3.0, 1.0, 12, 0.1, 0.4)]),
+    ]
+    index = TimezoneIndex()
+    for tzid, rings in polygons:
+        index.add_polygon(tzid, rings)
+    for _ in range(300):
+        x, y = rng.uniform(-5.0, 7.0), rng.uniform(-5.0, 5.0)
+        expected = next((tzid for tzid, rings in polygons if _point_in_rings(x, y, rings)), None)
+        assert lookup_uncached(index, y, x) == expected
+
+
+def test_load_geojson(tmp_path):
+    path = tmp_path / 'zones.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'tzid': 'Zone/Poly'},
+         'geometry': {'type': 'Polygon', 'coordinates': [[[0, 0], [2, 0], [2, 2], [0, 2], [0, 0]]]}},
+        {'type': 'Feature', 'properties': {'tzid': 'Zone/Multi'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [
+             [[[5, 5], [6, 5], [6, 6], [5, 6], [5, 5]]],
+             [[[8, 8], [9, 8], [9, 9], [8, 9], [8, 8]]]]}},
+        {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [[[3, 3], [4, 3], [4, 4]]]}},
+    ]}))
+    index = TimezoneIndex.load(str(path))
+    assert index.zone_names == {'Zone/Poly', 'Zone/Multi'}
+    assert index.lookup(1.0, 1.0) == 'Zone/Poly'
+    assert index.lookup(8.5, 8.5) == 'Zone/Multi'
+    assert index.lookup(3.2, 3.8) is None
+
+
+def test_bundled_data():
+    index = TimezoneIndex.load(BUNDLED_DATA)
+    assert index.lookup(52.52, 13.405) == 'Europe/Berlin'
+    assert index.lookup(40.7128, -74.006) == 'America/New_York'
+    assert index.lookup(34.05, -118.24) == 'America/Los_Angeles'
+    assert index.lookup(-33.87, 151.21) == 'Australia/Sydney'
+    assert index.lookup(22.57, 88.36) == 'Asia/Kolkata'
+    assert index.lookup(-18.14, 178.44) == 'Pacific/Fiji'
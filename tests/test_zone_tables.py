@@ -0,0 +1,78 @@
+import calendar
+import struct
+from datetime import timedelta
+
+import pytest
+
+zoneinfo = pytest.importorskip('zoneinfo')
+
+from batch_fixer_cli import (UNIX_EPOCH, build_zone_table, format_local_datetimes, parse_tzif,
+                             read_tzif)
+
+# Fixed and DST zones, half-hour DST (Lord Howe), wartime double summer time
+# (London), and zones whose rules changed long ago or recently
+ZONES = ['America/Los_Angeles', 'Europe/London', 'Australia/Lord_Howe', 'Asia/Kolkata',
+         'America/Sao_Paulo', 'Antarctica/Rothera', 'Africa/Casablanca', 'UTC']
+
+
+def zoneinfo_offset(tz_name, timestamp):
+    local = (UNIX_EPOCH + timedelta(seconds=timestamp)).astimezone(zoneinfo.ZoneInfo(tz_name))
+    return int(local.utcoffset().total_seconds())
+
+
+def tzif(transitions, type_indices, type_offsets, rule=b''):
+    """A version 2 TZif file with an empty version 1 block."""
+    header = b'TZif2' + bytes(15)
+    v1 = header + struct.pack('>6l', 0, 0, 0, 0, 1, 1) + struct.pack('>lBB', 0, 0, 0) + b'\x00'
+    data = b''.join(struct.pack('>q', t) for t in transitions) + bytes(type_indices)
+    data += b''.join(struct.pack('>lBB', offset, 0, 0) for offset in type_offsets) + b'\x00'
+    counts = struct.pack('>6l', 0, 0, 0, len(transitions), len(type_offsets), 1)
+    return v1 + header + counts + data + b'\n' + rule + b'\n'
+
+
+@pytest.fixture
+def tz_data():
+    if read_tzif('America/Los_Angeles') is None:
+        pytest.skip("no TZif data on this system")
+
+
+def test_parse_keeps_transitions_closer_than_a_day():
+    # +1 h for one hour, then back: sampling by end-of-step offset misses this
+    data = tzif([1000000, 1003600], [1, 0], [0, 3600], b'UTC0')
+    assert parse_tzif(data) == ([1000000, 1003600], [0, 3600, 0], 'UTC0')
+
+
+def test_parse_drops_changes_that_keep_the_offset():
+    data = tzif([100, 200, 300], [1, 2, 0], [0, 3600, 3600])
+    assert parse_tzif(data) == ([100, 300], [0, 3600, 0], '')
+
+
+def test_parse_rejects_other_files():
+    with pytest.raises(ValueError):
+        parse_tzif(b'not a zone file')
+
+
+@pytest.mark.parametrize('tz_name', ZONES)
+def test_table_matches_zoneinfo_at_every_transition(tz_data, tz_name):
+    table = build_zone_table(tz_name)
+    for transition in table.transitions:
+        for timestamp in (transition - 1, transition):
+            assert table.offset_at(timestamp) == zoneinfo_offset(tz_name, timestamp)
+
+
+@pytest.mark.parametrize('tz_name', ZONES)
+def test_table_matches_zoneinfo_outside_its_range(tz_data, tz_name):
+    table = build_zone_table(tz_name, last_year=2000)
+    for year in (1850, 1900, 1944, 1969, 2001, 2050, 2150):
+        for month in (1, 7):
+            timestamp = calendar.timegm((year, month, 15, 12, 0, 0))
+            assert table.offset_at(timestamp) == zoneinfo_offset(tz_name, timestamp)
+
+
+def test_formats_pre_1970_dates_with_historical_offsets(tz_data):
+    table = build_zone_table('Europe/London')
+    # British Double Summer Time, and Local Mean Time before 1847
+    timestamps = [calendar.timegm((1944, 6, 6, 6, 0, 0)), calendar.timegm((1840, 1, 1, 0, 0, 0))]
+    formatted, offsets = format_local_datetimes(timestamps, table)
+    assert offsets == [7200, -75]
+    assert formatted == ['1944:06:06 08:00:00', '1839:12:31 23:58:45']
@@ -0,0 +1,88 @@
+# Builds assets/timezones.geojson, the timezone boundaries bundled for
+# batch_fixer_cli.py's --tz auto-gps mode. Kept outside assets/ because
+# everything under assets/ ships with the app; run it from the repository
+# root only when refreshing the data:
+#
+#   pip install --target /tmp/tzbuild "timezonefinder==6.5.9" shapely numpy
+#   PYTHONPATH=/tmp/tzbuild python tools/build_timezone_data.py
+#
+# The polygons come from the timezonefinder package, which bundles the
+# timezone-boundary-builder "with oceans" release (data: ODbL 1.0). They are
+# simplified to about --tolerance degrees and rounded, which keeps the file a
+# few MB; points within about a kilometre of a zone border may resolve to the
+# neighbouring zone (or, in a sliver between two simplified borders, to the
+# --tz-default zone).
+
+import argparse
+import json
+import os
+
+from shapely.geometry import Polygon
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT = os.path.join(REPO_DIR, 'assets', 'timezones.geojson')
+
+ATTRIBUTION = ("Timezone boundaries: timezone-boundary-builder (https://github.com/evansiroky/"
+               "timezone-boundary-builder), ODbL 1.0, via the timezonefinder package; simplified.")
+
+
+def simplified_rings(polygon, tolerance, digits):
+    """[outer, hole, ...] as rounded [lng, lat] lists, or None if nothing is left."""
+    simple = polygon.simplify(tolerance, preserve_topology=True)
+    if simple.is_empty or simple.geom_type != 'Polygon':
+        return None
+    rings = []
+    for ring in [simple.exterior] + list(simple.interiors):
+        points = []
+        for x, y in ring.coords[:-1]:
+            point = [round(x, digits), round(y, digits)]
+            if not points or point != points[-1]:
+                points.append(point)
+        if len(points) >= 3:
+            rings.append(points)
+        elif not rings:
+            return None
+    return rings
+
+
+def build(tolerance, digits):
+    from timezonefinder import TimezoneFinder
+
+    finder = TimezoneFinder()
+    features = []
+    for tz_name in sorted(finder.timezone_names):
+        polygons = []
+        for outer, *holes in finder.get_geometry(tz_name=tz_name, coords_as_pairs=False):
+            polygon = Polygon(list(zip(*outer)), [list(zip(*hole)) for hole in holes])
+            rings = simplified_rings(polygon, tolerance, digits)
+            if rings:
+                polygons.append(rings)
+        if polygons:
+            features.append({
+                'type': 'Feature',
+                'properties': {'tzid': tz_name},
+                'geometry': {'type': 'MultiPolygon', 'coordinates': polygons},
+            })
+    return {'type': 'FeatureCollection', 'attribution': ATTRIBUTION, 'features': features}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the bundled timezone boundary GeoJSON.")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="Simplification tolerance in degrees (default: 0.01, about 1 km)")
+    parser.add_argument("--digits", type=int, default=3,
+                        help="Decimal places kept per coordinate (default: 3)")
+    parser.add_argument("--output", default=OUTPUT)
+    args = parser.parse_args()
+
+    data = build(args.tolerance, args.digits)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    vertices = sum(len(ring) for feature in data['features']
+                   for rings in feature['geometry']['coordinates'] for ring in rings)
+    print(f"Wrote {len(data['features'])} zones, {vertices} vertices, "
+          f"{os.path.getsize(args.output) / 1e6:.1f} MB to {args.output}")
+
+
+if __name__ == "__main__":
+    main()